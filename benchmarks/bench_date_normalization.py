@@ -0,0 +1,100 @@
+"""Benchmark date normalization: legacy strptime trial loop vs cached fast path.
+
+Usage: python benchmarks/bench_date_normalization.py [--values N] [--repeat R]
+"""
+import argparse
+import os
+import random
+import sys
+import timeit
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modular_app.config import DATE_INPUT_FORMATS
+from modular_app.services.date_service import normalize_date, clear_date_cache, date_cache_info
+
+OUTPUT_FORMAT = '%d-%b-%Y'
+
+# Rough share of each shape seen in invoice headers and manual edits.
+DATE_MIX = [
+    ('%d-%b-%y', 0.70),     # 31-Jan-26, as printed on invoices
+    ('%d-%b-%Y', 0.10),     # 31-Jan-2026
+    ('%d/%m/%Y', 0.08),     # 31/01/2026
+    ('%d-%m-%Y', 0.08),     # 31-01-2026, dispatch date entry
+    (None, 0.04),           # unparseable manual input
+]
+
+
+def legacy_format_date(value, output_format, upper=False):
+    if not value:
+        return value
+    for fmt in DATE_INPUT_FORMATS:
+        try:
+            dt = datetime.strptime(value, fmt)
+            formatted = dt.strftime(output_format)
+            return formatted.upper() if upper else formatted
+        except Exception:
+            continue
+    return value
+
+
+def build_values(count, distinct_days, seed=42):
+    rng = random.Random(seed)
+    start = date(2025, 4, 1)
+    formats = [fmt for fmt, _ in DATE_MIX]
+    weights = [weight for _, weight in DATE_MIX]
+    values = []
+    for _ in range(count):
+        day = start + timedelta(days=rng.randrange(distinct_days))
+        fmt = rng.choices(formats, weights)[0]
+        values.append(day.strftime(fmt) if fmt else f"{day.day} Jan")
+    return values
+
+
+def run(values, repeat):
+    def legacy():
+        for value in values:
+            legacy_format_date(value, OUTPUT_FORMAT, upper=True)
+
+    def cached():
+        for value in values:
+            normalize_date(value, OUTPUT_FORMAT, upper=True)
+
+    mismatches = sum(
+        1 for value in values
+        if legacy_format_date(value, OUTPUT_FORMAT, True) != normalize_date(value, OUTPUT_FORMAT, True)
+    )
+
+    legacy_time = min(timeit.repeat(legacy, number=1, repeat=repeat))
+
+    cold_times = []
+    for _ in range(repeat):
+        clear_date_cache()
+        cold_times.append(timeit.timeit(cached, number=1))
+    cold_time = min(cold_times)
+
+    warm_time = min(timeit.repeat(cached, number=1, repeat=repeat))
+
+    per_call = 1e6 / len(values)
+    print(f"values: {len(values)}  distinct: {len(set(values))}  mismatches: {mismatches}")
+    print(f"legacy trial loop : {legacy_time * per_call:8.2f} us/call")
+    print(f"fast path (cold)  : {cold_time * per_call:8.2f} us/call  ({legacy_time / cold_time:5.1f}x)")
+    print(f"fast path (warm)  : {warm_time * per_call:8.2f} us/call  ({legacy_time / warm_time:5.1f}x)")
+    print(f"cache: {date_cache_info()}")
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--values', type=int, default=20000)
+    parser.add_argument('--days', type=int, default=365, help="distinct calendar days in the mix")
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    mismatches = run(build_values(args.values, args.days), args.repeat)
+    return 1 if mismatches else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
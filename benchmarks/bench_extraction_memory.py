@@ -0,0 +1,62 @@
+"""Benchmark extraction memory: slim validation_info vs keeping the full PDF text.
+
+Usage: python benchmarks/bench_extraction_memory.py [--invoices N] [--folder Invoice]
+
+Extracts the sample PDFs round-robin until N results are held, as a batch
+caller that keeps extraction results would, and reports the traced heap with
+and without keep_text. Validation verdicts must be identical in both modes.
+"""
+import argparse
+import gc
+import glob
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modular_app.services.invoice_service import extract_invoice_data, validate_invoice_integrity
+
+
+def measure(paths, keep_text):
+    gc.collect()
+    tracemalloc.start()
+    results = []
+    for path in paths:
+        invoice_data, line_items, validation_info = extract_invoice_data(path, keep_text=keep_text)
+        verdict = validate_invoice_integrity(invoice_data, validation_info)
+        results.append((invoice_data, line_items, validation_info, verdict))
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current, peak, [result[3] for result in results]
+
+
+def main():
+    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--invoices', type=int, default=50, help="extraction results held at once")
+    parser.add_argument('--folder', default=os.path.join(base_dir, 'Invoice'))
+    args = parser.parse_args()
+
+    samples = sorted(glob.glob(os.path.join(args.folder, '*.pdf')))
+    if not samples:
+        print(f"No PDFs found in {args.folder}", file=sys.stderr)
+        return 2
+    paths = [samples[i % len(samples)] for i in range(args.invoices)]
+
+    full_current, full_peak, full_verdicts = measure(paths, keep_text=True)
+    slim_current, slim_peak, slim_verdicts = measure(paths, keep_text=False)
+
+    kib = 1024
+    print(f"invoices: {len(paths)}  samples: {len(samples)}  "
+          f"verdict mismatches: {sum(a != b for a, b in zip(full_verdicts, slim_verdicts))}")
+    print(f"keep_text=True : {full_current / kib:9.1f} KiB retained  ({full_peak / kib:9.1f} KiB peak)")
+    print(f"slim (default) : {slim_current / kib:9.1f} KiB retained  ({slim_peak / kib:9.1f} KiB peak)")
+    print(f"retained saved : {(full_current - slim_current) / kib:9.1f} KiB "
+          f"({100 * (1 - slim_current / full_current):.0f}%)")
+    return 1 if full_verdicts != slim_verdicts else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
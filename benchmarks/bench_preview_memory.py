@@ -0,0 +1,115 @@
+"""Benchmark preview memory: 19-key dict rows vs PreviewRow slots.
+
+Usage: python benchmarks/bench_preview_memory.py [--invoices N] [--rows R]
+
+Builds a batch of previews shaped like SpoolPipeline.load_invoice output and
+reports the traced heap for the old layout (dict rows plus a copied
+invoice_line_items per preview) against the current one. Process RSS before
+and after each build is reported as well, from a separate untraced build.
+RSS is process-wide and the allocator keeps freed arenas, so it is the
+coarser of the two figures.
+"""
+import argparse
+import gc
+import os
+import random
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modular_app.config import COLUMNS
+from modular_app.models import PreviewRow
+from modular_app.services.memory_profile import current_rss, format_bytes
+
+
+def build_invoice(rng, index, row_count):
+    inv_no = f"G/I/25-26/{index:05d}"
+    invoice_data = {
+        'invoice_no': inv_no, 'invoice_date': '31-Jan-26', 'po_number': f"{rng.randrange(10**9):09d}",
+        'gst_no': '27AAACN1234F1Z5', 'cgst_amt': f"{rng.uniform(100, 9999):.2f}",
+        'sgst_amt': f"{rng.uniform(100, 9999):.2f}", 'igst_amt': '', 'eway_bill': '0',
+        'total_value': f"{rng.uniform(1000, 99999):.2f}", 'vendor_code': 'X539', 'irn_number': 'f' * 64,
+    }
+    line_items = {}
+    rows = []
+    for idx in range(row_count):
+        part = f"{rng.randrange(10**7):07d}M{rng.randrange(100):02d}"
+        line_items[part] = {'hsn_code': '87089900', 'rate': f"{rng.uniform(1, 999):.2f}",
+                            'qty': str(rng.randrange(1, 500))}
+        values = {col_id: '' for col_id, _, _ in COLUMNS}
+        values.update(
+            unload_no=f"20260131{idx + 1:02d}", schedule_no=f"KB{rng.randrange(10**8):08d}", item_code=part,
+            qty=line_items[part]['qty'], po_number=invoice_data['po_number'], bin_qty=str(rng.randrange(1, 50)),
+            gst_no=invoice_data['gst_no'], hsn_code='87089900', cgst_amt=invoice_data['cgst_amt'],
+            sgst_amt=invoice_data['sgst_amt'], eway_bill='0', basic_price=line_items[part]['rate'],
+            total_value=invoice_data['total_value'], tool_amort='0',
+        )
+        rows.append(values)
+    return invoice_data, line_items, rows
+
+
+def build_batch(invoices, row_count, compact, seed=7):
+    rng = random.Random(seed)
+    previews = []
+    for index in range(invoices):
+        invoice_data, line_items, rows = build_invoice(rng, index, row_count)
+        if compact:
+            previews.append({'invoice_data': invoice_data,
+                             'preview_data': [PreviewRow(row) for row in rows]})
+        else:
+            previews.append({'invoice_data': dict(invoice_data), 'invoice_line_items': dict(line_items),
+                             'preview_data': rows})
+    return previews
+
+
+def measure_rss(invoices, row_count, compact):
+    """(RSS before, RSS after) an untraced build of the batch; either is None if RSS cannot be read."""
+    gc.collect()
+    before = current_rss()
+    previews = build_batch(invoices, row_count, compact)
+    gc.collect()
+    after = current_rss()
+    del previews
+    gc.collect()
+    return before, after
+
+
+def measure(invoices, row_count, compact):
+    gc.collect()
+    tracemalloc.start()
+    previews = build_batch(invoices, row_count, compact)
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del previews
+    return current, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--invoices', type=int, default=1000)
+    parser.add_argument('--rows', type=int, default=8, help="preview rows per invoice")
+    args = parser.parse_args()
+
+    # RSS first: tracemalloc's own bookkeeping would otherwise show up in it.
+    rss = {compact: measure_rss(args.invoices, args.rows, compact) for compact in (False, True)}
+    dict_current, dict_peak = measure(args.invoices, args.rows, compact=False)
+    slot_current, slot_peak = measure(args.invoices, args.rows, compact=True)
+
+    mib = 1024 * 1024
+    print(f"invoices: {args.invoices}  rows/invoice: {args.rows}")
+    print(f"dict rows    : {dict_current / mib:7.2f} MiB retained  ({dict_peak / mib:7.2f} MiB peak)")
+    print(f"PreviewRow   : {slot_current / mib:7.2f} MiB retained  ({slot_peak / mib:7.2f} MiB peak)")
+    print(f"saved        : {(dict_current - slot_current) / mib:7.2f} MiB "
+          f"({100 * (1 - slot_current / dict_current):.0f}%)")
+    print("process RSS (untraced build, before -> after):")
+    for compact, label in ((False, 'dict rows'), (True, 'PreviewRow')):
+        before, after = rss[compact]
+        delta = after - before if before is not None and after is not None else None
+        print(f"  {label:11s}: {format_bytes(before)} -> {format_bytes(after)}  ({format_bytes(delta)})")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
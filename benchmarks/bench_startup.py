@@ -0,0 +1,93 @@
+"""Benchmark GUI startup: import cost and time to first frame, lazy vs eager imports.
+
+Usage: python benchmarks/bench_startup.py [--repeat R] [--top N]
+
+"eager" pre-imports pandas, pdfplumber and PyMuPDF before the app modules,
+which reproduces the old module-load behaviour. Each measurement runs in a
+fresh interpreter. Time to first frame needs a display and is reported as
+n/a without one.
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+EAGER_IMPORTS = "import pandas, pdfplumber\ntry:\n    import pymupdf\nexcept ImportError:\n    pass\n"
+
+IMPORT_APP = "import modular_app.controller, modular_app.ui.view\n"
+
+FIRST_FRAME = """
+import time
+start = time.perf_counter()
+{eager}
+import tkinter as tk
+from datetime import datetime
+from modular_app.ui.view import SpoolAppView
+from modular_app.controller import SpoolAppController
+try:
+    root = tk.Tk()
+except tk.TclError:
+    print('n/a')
+    raise SystemExit(0)
+callbacks = dict.fromkeys(['browse_invoices', 'browse_excel', 'find_workbook', 'load_preview', 'generate_all',
+                           'save_changes', 'clear_all', 'view_output', 'prev_preview', 'next_preview',
+                           'cancel', 'close'], lambda: None)
+callbacks['get_today'] = lambda: datetime.now().strftime('%d-%m-%Y')
+view = SpoolAppView(root, callbacks)
+SpoolAppController(root, view)
+root.update()
+print(time.perf_counter() - start)
+root.destroy()
+"""
+
+
+def run_python(code, *flags):
+    return subprocess.run([sys.executable, *flags, '-c', code], cwd=BASE_DIR,
+                          capture_output=True, text=True, check=True)
+
+
+def import_times(code):
+    """Parse -X importtime output into {top-level module: cumulative seconds}."""
+    stderr = run_python(code, '-X', 'importtime').stderr
+    totals = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if name.startswith('  ') or not cumulative.strip().isdigit():
+            continue
+        totals[name.strip()] = totals.get(name.strip(), 0) + int(cumulative) / 1e6
+    return totals
+
+
+def first_frame(eager):
+    output = run_python(FIRST_FRAME.format(eager=EAGER_IMPORTS if eager else '')).stdout.strip()
+    return None if output == 'n/a' else float(output)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--top', type=int, default=8, help="heaviest top-level imports to list")
+    args = parser.parse_args()
+
+    for label, code in (('eager', EAGER_IMPORTS + IMPORT_APP), ('lazy', IMPORT_APP)):
+        runs = [import_times(code) for _ in range(args.repeat)]
+        totals = [sum(run.values()) for run in runs]
+        best = runs[totals.index(min(totals))]
+        print(f"{label:5s} imports: {min(totals) * 1000:8.1f} ms  (best of {args.repeat})")
+        for name, seconds in sorted(best.items(), key=lambda item: -item[1])[:args.top]:
+            print(f"        {seconds * 1000:8.1f} ms  {name}")
+
+        frames = [first_frame(label == 'eager') for _ in range(args.repeat)]
+        if None in frames:
+            print("        first frame: n/a (no display)")
+        else:
+            print(f"        first frame: {min(frames) * 1000:8.1f} ms")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,237 @@
+"""Golden-output equivalence check for spool engines.
+
+Usage:
+    python benchmarks/golden_equivalence.py                                  # reference + CLI batch vs goldens
+    python benchmarks/golden_equivalence.py --candidate mypkg.fast:engine    # also check a candidate engine
+    python benchmarks/golden_equivalence.py --synthetic 200                  # plus 200 synthetic invoices
+
+An engine is a callable engine(invoice_paths, excel_path, dispatch_date, is_spare)
+returning {spool file name: [lines]}. The reference engine is the current
+extract_invoice_data -> match -> generate_spool_line path. Each engine's
+output is diffed line by line and field by field (config.SPOOL_LAYOUT)
+against the golden file of the same name in --golden; invoices without a
+golden file (e.g. synthetic data) are diffed against the reference output.
+Every golden file must be produced, so --golden has to match --invoices.
+The sample data is also written twice as a consolidated daily file: the
+rerun must add nothing, and every invoice must appear in the file once and
+match its golden file. Any difference exits with code 1.
+"""
+import argparse
+import importlib
+import json
+import os
+import sys
+import tempfile
+from datetime import datetime
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from modular_app.cli import collect_invoice_paths, resolve_workbook, run_batch
+from modular_app.config import LINE_LENGTH, SPOOL_LAYOUT
+from modular_app.pipeline import SpoolPipeline
+from modular_app.services.spool_service import spool_filename
+
+DEFAULT_GOLDEN = os.path.join(BASE_DIR, 'modular_app', 'SpoolOutput', 'Original')
+
+
+def reference_engine(invoice_paths, excel_path, dispatch_date, is_spare):
+    pipeline = SpoolPipeline(is_spare, dispatch_date)
+    pipeline.load(excel_path)
+    outputs = {}
+    for path in invoice_paths:
+        preview, _ = pipeline.prepare(path)
+        if preview is not None:
+            outputs[spool_filename(preview['invoice_data']['invoice_no'].strip())] = pipeline.format(preview)
+    return outputs
+
+
+def cli_engine(invoice_paths, excel_path, dispatch_date, is_spare):
+    """The headless batch end to end, including the write path; output is read back from disk."""
+    with tempfile.TemporaryDirectory() as output_folder:
+        summary = run_batch(invoice_paths, excel_path, dispatch_date, is_spare, output_folder, force=True)
+        outputs = {}
+        for result in summary['invoices']:
+            if result['status'] == 'written':
+                with open(result['output'], 'r', encoding='utf-8') as f:
+                    outputs[os.path.basename(result['output'])] = f.read().splitlines()
+        return outputs
+
+
+def check_consolidated_rerun(invoice_paths, excel_path, dispatch_date, is_spare, golden_dir):
+    """Run a consolidated batch twice into one folder; returns a report shaped like compare_engines'."""
+    with tempfile.TemporaryDirectory() as output_folder:
+        first = run_batch(invoice_paths, excel_path, dispatch_date, is_spare, output_folder, consolidated=True)
+        rerun = run_batch(invoice_paths, excel_path, dispatch_date, is_spare, output_folder, consolidated=True)
+        with open(rerun['consolidated_file'], 'r', encoding='utf-8') as f:
+            lines = f.read().splitlines()
+        manifest_path = os.path.splitext(rerun['consolidated_file'])[0] + '.manifest.json'
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            entries = json.load(f)['invoices']
+
+    diffs = []
+    if rerun['counts']['written']:
+        diffs.append({'line': None, 'field': 'rerun_written', 'expected': 0, 'actual': rerun['counts']['written']})
+    if rerun['counts']['skipped'] != first['counts']['written']:
+        diffs.append({'line': None, 'field': 'rerun_skipped', 'expected': first['counts']['written'],
+                      'actual': rerun['counts']['skipped']})
+    seen = set()
+    for entry in entries:
+        if entry['invoice_no'] in seen:
+            diffs.append({'line': entry['first_line'], 'field': 'duplicate_invoice', 'columns': '',
+                          'expected': 'once', 'actual': entry['invoice_no']})
+            continue
+        seen.add(entry['invoice_no'])
+        golden = read_golden(golden_dir, spool_filename(entry['invoice_no'])) if golden_dir else None
+        if golden is not None:
+            block = lines[entry['first_line'] - 1:entry['first_line'] - 1 + entry['line_count']]
+            diffs.extend(dict(diff, line=diff['line'] and diff['line'] + entry['first_line'] - 1)
+                         for diff in diff_spool(golden, block))
+    name = os.path.basename(manifest_path).replace('.manifest.json', '.txt')
+    return {'consolidated': {'files': len(entries), 'failures': {name: diffs} if diffs else {}}}
+
+
+def load_engine(spec):
+    """Resolve 'package.module:function' to an engine callable."""
+    module_name, _, attr = spec.partition(':')
+    if not attr:
+        raise ValueError(f"candidate must be module:function, got {spec!r}")
+    return getattr(importlib.import_module(module_name), attr)
+
+
+def golden_files(folder):
+    """Names of the golden spool files in `folder`."""
+    if not folder or not os.path.isdir(folder):
+        return []
+    return [name for name in os.listdir(folder) if name.lower().endswith('.txt')]
+
+
+def read_golden(folder, name):
+    path = os.path.join(folder, name)
+    if not os.path.isfile(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read().splitlines()
+
+
+def diff_line(expected, actual):
+    """Return (field, start, end, expected, actual) for every layout field that differs."""
+    diffs = []
+    if len(actual) != LINE_LENGTH:
+        diffs.append(('line_length', 0, LINE_LENGTH, LINE_LENGTH, len(actual)))
+    for field, start, end in SPOOL_LAYOUT:
+        if expected[start:end] != actual[start:end]:
+            diffs.append((field, start, end, expected[start:end], actual[start:end]))
+    return diffs
+
+
+def diff_spool(expected, actual):
+    """Field-level differences between two spool files given as lists of lines."""
+    diffs = []
+    if len(expected) != len(actual):
+        diffs.append({'line': None, 'field': 'line_count', 'expected': len(expected), 'actual': len(actual)})
+    for number, (expected_line, actual_line) in enumerate(zip(expected, actual), start=1):
+        for field, start, end, want, got in diff_line(expected_line, actual_line):
+            diffs.append({'line': number, 'field': field, 'columns': f"{start + 1}-{end}",
+                          'expected': want, 'actual': got})
+    return diffs
+
+
+def compare_engines(engines, invoice_paths, excel_path, dispatch_date, is_spare, golden_dir):
+    """Run every engine and diff its files. Returns {engine: {file: [diffs]}} with only failing files."""
+    outputs = {name: engine(invoice_paths, excel_path, dispatch_date, is_spare) for name, engine in engines}
+    reference = outputs.get('reference', {})
+    # A golden file no engine produces any more is a dropped invoice, so it is checked too.
+    expected_files = set(golden_files(golden_dir))
+    report = {}
+    for name, files in outputs.items():
+        failures = {}
+        for file_name in sorted(set(files) | set(reference) | expected_files):
+            golden = read_golden(golden_dir, file_name) if golden_dir else None
+            expected = golden if golden is not None else reference.get(file_name)
+            if name == 'reference' and golden is None:
+                continue
+            if expected is None or file_name not in files:
+                failures[file_name] = [{'line': None, 'field': 'missing',
+                                        'expected': expected is not None, 'actual': file_name in files}]
+                continue
+            diffs = diff_spool(expected, files[file_name])
+            if diffs:
+                failures[file_name] = diffs
+        report[name] = {'files': len(files), 'failures': failures}
+    return report
+
+
+def print_report(title, report, limit):
+    print(f"\n{title}")
+    for name, result in report.items():
+        failures = result['failures']
+        status = 'OK' if not failures else f"{len(failures)} file(s) differ"
+        print(f"  {name:12s} {result['files']:5d} file(s)  {status}")
+        for file_name, diffs in sorted(failures.items())[:limit]:
+            for diff in diffs[:limit]:
+                where = f"line {diff['line']} {diff['field']} [{diff.get('columns', '')}]" if diff['line'] else diff['field']
+                print(f"      {file_name}: {where}: expected {diff['expected']!r} got {diff['actual']!r}")
+            if len(diffs) > limit:
+                print(f"      {file_name}: ... and {len(diffs) - limit} more difference(s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--invoices', nargs='+', default=[os.path.join(BASE_DIR, 'Invoice')])
+    parser.add_argument('--workbook', default=os.path.join(BASE_DIR, 'Excel'))
+    parser.add_argument('--date', default='31-01-2026', help="dispatch date DD-MM-YYYY")
+    parser.add_argument('--mode', choices=['OE', 'Spare'], default='OE')
+    parser.add_argument('--golden', default=DEFAULT_GOLDEN, help=f"golden spool files (default: {DEFAULT_GOLDEN})")
+    parser.add_argument('--candidate', action='append', default=[], metavar='MODULE:FUNCTION',
+                        help="engine to check against the goldens (repeatable)")
+    parser.add_argument('--no-cli', action='store_true', help="skip the built-in CLI batch engine")
+    parser.add_argument('--synthetic', type=int, default=0, metavar='N',
+                        help="also check N synthetic invoices (candidates diffed against the reference)")
+    parser.add_argument('--limit', type=int, default=5, help="differences shown per file (default: 5)")
+    parser.add_argument('--report', help="write the full difference report as JSON to this file")
+    args = parser.parse_args()
+
+    dispatch_date = datetime.strptime(args.date, '%d-%m-%Y')
+    is_spare = args.mode == 'Spare'
+    engines = [('reference', reference_engine)]
+    if not args.no_cli:
+        engines.append(('cli', cli_engine))
+    engines += [(spec, load_engine(spec)) for spec in args.candidate]
+
+    excel_path = resolve_workbook(args.workbook, dispatch_date)
+    invoice_paths = collect_invoice_paths(args.invoices)
+    if not excel_path or not invoice_paths:
+        print("Sample data not found; check --invoices/--workbook/--date", file=sys.stderr)
+        return 2
+
+    reports = {'sample': compare_engines(engines, invoice_paths, excel_path, dispatch_date, is_spare, args.golden)}
+    print_report(f"Sample data ({len(invoice_paths)} invoice(s), golden: {args.golden})", reports['sample'],
+                 args.limit)
+
+    reports['rerun'] = check_consolidated_rerun(invoice_paths, excel_path, dispatch_date, is_spare, args.golden)
+    print_report("Consolidated rerun on the same day (each invoice once, nothing rewritten)", reports['rerun'],
+                 args.limit)
+
+    if args.synthetic:
+        from synthetic_data import generate
+        with tempfile.TemporaryDirectory() as tmp:
+            data = generate(tmp, invoices=args.synthetic, rows=max(1000, args.synthetic * 5),
+                            dispatch_date=dispatch_date, csv=False, log=lambda message: None)
+            workbook = data['workbooks'][1 if is_spare else 0]
+            synthetic_paths = collect_invoice_paths([data['invoice_dir']])
+            reports['synthetic'] = compare_engines(engines, synthetic_paths, workbook, dispatch_date, is_spare, None)
+        print_report(f"Synthetic data ({args.synthetic} invoice(s), against reference)", reports['synthetic'],
+                     args.limit)
+
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(reports, f, indent=2)
+
+    failed = any(result['failures'] for report in reports.values() for result in report.values())
+    print("\nFAILED: spool output differs" if failed else "\nAll engines match", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,219 @@
+"""Per-stage and end-to-end benchmarks for the spool pipeline.
+
+Usage:
+    python benchmarks/run_benchmarks.py                         # run, save results JSON
+    python benchmarks/run_benchmarks.py --save-baseline         # also store as the baseline
+    python benchmarks/run_benchmarks.py --baseline benchmarks/baseline.json --threshold 0.15
+
+Stages: extract, signature_cold, signature_warm, workbook_load, match,
+reconcile, format, write, end_to_end. The signature stages go through the
+verdict cache, emptied before every cold run and filled before the warm ones. Every stage is timed over --repeat runs; the median is compared
+against the baseline and a slowdown beyond --threshold (and more than
+--min-delta seconds, so sub-millisecond jitter is ignored) is flagged as a
+regression (exit code 1).
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from modular_app.cli import collect_invoice_paths, resolve_workbook, run_batch
+from modular_app.pipeline import SpoolPipeline
+from modular_app.services.invoice_service import extract_invoice_data, verify_signature
+from modular_app.services.signature_cache import SIGNATURE_CACHE_ENV, get_signature_cache
+from modular_app.services.spool_service import write_spool_file
+
+RESULTS_DIR = os.path.join(BASE_DIR, 'benchmarks', 'results')
+DEFAULT_BASELINE = os.path.join(BASE_DIR, 'benchmarks', 'baseline.json')
+
+
+@contextlib.contextmanager
+def isolated_signature_cache():
+    """Point the signature verdict cache at an empty temporary database for the duration of the run."""
+    cache_dir = tempfile.mkdtemp(prefix='spool-bench-')
+    previous = os.environ.get(SIGNATURE_CACHE_ENV)
+    os.environ[SIGNATURE_CACHE_ENV] = os.path.join(cache_dir, 'signature_cache.sqlite3')
+    get_signature_cache.cache_clear()
+    try:
+        yield
+    finally:
+        cache = get_signature_cache()
+        if cache is not None:
+            cache.close()
+        get_signature_cache.cache_clear()
+        if previous is None:
+            os.environ.pop(SIGNATURE_CACHE_ENV, None)
+        else:
+            os.environ[SIGNATURE_CACHE_ENV] = previous
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+
+def time_runs(func, repeat):
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - started)
+    return times
+
+
+def summarize(times, items):
+    return {
+        'repeat': len(times),
+        'items': items,
+        'min': min(times),
+        'median': statistics.median(times),
+        'mean': statistics.fmean(times),
+        'max': max(times),
+        'per_item': statistics.median(times) / items if items else None,
+    }
+
+
+def run_suite(invoice_paths, excel_path, dispatch_date, is_spare, repeat, stages=None):
+    results = {}
+
+    def bench(name, func, items):
+        if stages and name not in stages:
+            return
+        results[name] = summarize(time_runs(func, repeat), items)
+        print(f"{name:14s} median {results[name]['median'] * 1000:9.2f} ms  ({items} item(s))", file=sys.stderr)
+
+    pipeline = SpoolPipeline(is_spare, dispatch_date)
+    pipeline.load(excel_path)
+
+    extracted = [extract_invoice_data(path) for path in invoice_paths]
+    matched = [(pipeline.match(invoice_data, line_items), line_items)
+               for invoice_data, line_items, _ in extracted]
+    previews = [preview for preview, _ in map(pipeline.prepare, invoice_paths) if preview is not None]
+    formatted = [pipeline.format(preview) for preview in previews]
+    line_total = sum(len(lines) for lines in formatted)
+
+    bench('extract', lambda: [extract_invoice_data(path) for path in invoice_paths], len(invoice_paths))
+    def verify_cold():
+        cache = get_signature_cache()
+        if cache is not None:
+            cache.clear()
+        return [verify_signature(path) for path in invoice_paths]
+    bench('signature_cold', verify_cold, len(invoice_paths))
+    for path in invoice_paths:
+        verify_signature(path)
+    bench('signature_warm', lambda: [verify_signature(path) for path in invoice_paths], len(invoice_paths))
+    bench('workbook_load', lambda: SpoolPipeline(is_spare, dispatch_date).load(excel_path), 1)
+    bench('match', lambda: [pipeline.match(invoice_data, line_items) for invoice_data, line_items, _ in extracted],
+          len(extracted))
+    bench('reconcile', lambda: [pipeline.reconcile(rows, line_items) for rows, line_items in matched], len(matched))
+    bench('format', lambda: [pipeline.format(preview) for preview in previews], line_total)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        def write_all():
+            for index, lines in enumerate(formatted):
+                write_spool_file(os.path.join(tmp, f"{index:05d}.txt"), lines)
+        bench('write', write_all, line_total)
+
+        def end_to_end():
+            with tempfile.TemporaryDirectory(dir=tmp) as output_folder:
+                run_batch(invoice_paths, excel_path, dispatch_date, is_spare, output_folder)
+        bench('end_to_end', end_to_end, len(invoice_paths))
+
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, threshold, min_delta=0.0):
+    """Return (name, baseline median, current median, ratio, regressed) for stages present in both."""
+    rows = []
+    for name, current in results.items():
+        previous = baseline.get('benchmarks', {}).get(name)
+        if not previous or not previous.get('median'):
+            continue
+        ratio = current['median'] / previous['median']
+        regressed = ratio > 1 + threshold and current['median'] - previous['median'] > min_delta
+        rows.append((name, previous['median'], current['median'], ratio, regressed))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--invoices', nargs='+', default=[os.path.join(BASE_DIR, 'Invoice')])
+    parser.add_argument('--workbook', default=os.path.join(BASE_DIR, 'Excel'))
+    parser.add_argument('--date', default='31-01-2026', help="dispatch date DD-MM-YYYY")
+    parser.add_argument('--mode', choices=['OE', 'Spare'], default='OE')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--stages', nargs='+', help="only run these stages")
+    parser.add_argument('--output', help="results file (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument('--baseline', help=f"compare against this results file (default: {DEFAULT_BASELINE} if present)")
+    parser.add_argument('--threshold', type=float, default=0.10, help="allowed median slowdown (default: 0.10)")
+    parser.add_argument('--min-delta', type=float, default=0.002,
+                        help="ignore slowdowns smaller than this many seconds (default: 0.002)")
+    parser.add_argument('--save-baseline', action='store_true', help="store these results as the baseline")
+    args = parser.parse_args()
+
+    dispatch_date = datetime.strptime(args.date, '%d-%m-%Y')
+    excel_path = resolve_workbook(args.workbook, dispatch_date)
+    invoice_paths = collect_invoice_paths(args.invoices)
+    if not excel_path or not invoice_paths:
+        print("Benchmark data not found; check --invoices/--workbook/--date", file=sys.stderr)
+        return 2
+
+    # Verdicts cached by earlier runs or by the app would otherwise skew the timings.
+    with isolated_signature_cache():
+        benchmarks = run_suite(invoice_paths, excel_path, dispatch_date, args.mode == 'Spare',
+                               args.repeat, args.stages)
+
+    report = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'workbook': os.path.relpath(excel_path, BASE_DIR),
+        'invoices': len(invoice_paths),
+        'mode': args.mode,
+        'benchmarks': benchmarks,
+    }
+
+    output = args.output or os.path.join(RESULTS_DIR, datetime.now().strftime('%Y%m%d-%H%M%S') + '.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}", file=sys.stderr)
+
+    baseline_path = args.baseline or (DEFAULT_BASELINE if os.path.exists(DEFAULT_BASELINE) else None)
+    regressed = False
+    if baseline_path and not args.save_baseline:
+        with open(baseline_path, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        print(f"\nCompared with {baseline_path} (revision {baseline.get('revision')}):")
+        for name, before, after, ratio, is_regression in compare(report['benchmarks'], baseline, args.threshold,
+                                                                   args.min_delta):
+            flag = '  REGRESSION' if is_regression else ''
+            print(f"  {name:14s} {before * 1000:9.2f} -> {after * 1000:9.2f} ms  x{ratio:5.2f}{flag}")
+            regressed |= is_regression
+
+    if args.save_baseline:
+        with open(DEFAULT_BASELINE, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline saved to {DEFAULT_BASELINE}", file=sys.stderr)
+
+    return 1 if regressed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
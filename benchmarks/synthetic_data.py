@@ -0,0 +1,257 @@
+"""Generate synthetic invoice PDFs and matching dispatch workbooks for scale testing.
+
+Usage:
+    python benchmarks/synthetic_data.py --output /tmp/synthetic --invoices 10000 --rows 100000
+
+Writes:
+    <output>/Invoice/<n>.pdf          invoices laid out the way extract_invoice_data parses them
+    <output>/Excel/dispatch_oe.xlsx   OE workbook, one sheet per day (DD-MM-YYYY, 2 preamble rows)
+    <output>/Excel/dispatch_spare.xlsx  Spare workbook (DD-MM-YY RPDC sheets)
+    <output>/Excel/dispatch_oe.csv, dispatch_spare.csv
+
+Every invoice has matching dispatch rows on the --date sheet whose quantities
+reconcile with the invoice. The remaining rows up to --rows belong to
+previous-year invoices, so they enlarge the search without ever matching.
+Output is deterministic for a given --seed.
+"""
+import argparse
+import hashlib
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modular_app.services.lazy_imports import get_pandas, get_pymupdf
+
+VENDOR_GSTIN = '24AAKCA9081E1ZN'
+BUYER_GSTIN = '24AAACM0829Q3Z8'
+VENDOR_CODE = 'X539'
+
+OE_COLUMNS = ['INVOICE NO', 'KANBAN NO', 'PART NUMBER', 'Material  Code', 'PART NAME', 'SUPPLY DATE',
+              'Qty Req', 'Packing Standerd']
+SPARE_COLUMNS = ['Supply For', 'Vendor Code', 'INVOICE NO', 'DI Number', 'Part Number', 'Scheduled Quantity',
+                 'Packing Standerd', 'Latest Batch Code']
+
+PAGE_HEIGHT = 842
+LINE_HEIGHT = 12
+MARGIN = 40
+
+
+def invoice_number(number, series='25-26'):
+    return f"G/I/{series}/{number % 100000:05d}"
+
+
+def build_parts(rng, count):
+    parts = []
+    for _ in range(count):
+        code = f"{rng.randrange(10000, 99999)}M{rng.choice('5A')}8U{rng.randrange(10, 99)}"
+        parts.append({
+            'part': code,
+            'marker': f"{code[:6]}-{code[6:]}",
+            'material': f"{rng.randrange(110000, 149999)}-{rng.randrange(10000, 99999)}",
+            'hsn': rng.choice(['87083000', '90328990', '87089900']),
+            'rate': round(rng.uniform(100, 40000), 3),
+            'packing': rng.choice([1, 6, 10, 18, 40]),
+        })
+    return parts
+
+
+def build_invoices(rng, count, start_number, items_per_invoice, parts, dispatch_date):
+    invoices = []
+    for index in range(count):
+        number = start_number + index
+        items = []
+        for part in rng.sample(parts, min(items_per_invoice, len(parts))):
+            items.append(dict(part, qty=rng.randrange(1, 60)))
+        taxable = sum(item['qty'] * item['rate'] for item in items)
+        tax = round(taxable * 0.09, 2)
+        invoices.append({
+            'number': number,
+            'invoice_no': invoice_number(number),
+            'date': dispatch_date,
+            'po': str(rng.randrange(1000000, 9999999)),
+            'irn': hashlib.sha256(invoice_number(number).encode('ascii')).hexdigest(),
+            'items': items,
+            'taxable': taxable,
+            'cgst': tax,
+            'sgst': tax,
+        })
+    return invoices
+
+
+def invoice_lines(invoice):
+    inv_date = invoice['date'].strftime('%d-%b-%y')
+    lines = [
+        "Tax Invoice Original for Recipient",
+        f"SYNTHETIC SUPPLIER PVT. LTD. IRN NO:{invoice['irn']}",
+        f"GSTIN Number : {VENDOR_GSTIN} Page 1 of 1",
+        f"Invoice Number : {invoice['invoice_no']} Cust PO No. : {invoice['po']} Transporation Mode : By Road",
+        f"Invoice Date : {inv_date} Reference No. : {VENDOR_CODE} Docket / Vehicle No. :",
+        f"GSTIN Number {BUYER_GSTIN} State :24 Gujarat",
+        "S.No. Description Of Goods & Services HSN/SAC Qty. UOM Rate Commercial CGST SGST/UTGST IGST TCS",
+    ]
+    for sno, item in enumerate(invoice['items'], start=1):
+        amount = item['qty'] * item['rate']
+        tax = amount * 0.09
+        lines.append(f"{sno} {item['material']} {item['hsn']} {item['qty']}.00 Nos {item['rate']:,.3f} "
+                     f"{amount:,.2f} 9.00 {tax:,.2f} 9.00 {tax:,.2f} 0.00 0.00 0.00")
+        lines.append(f"Synthetic Part ({item['marker']})")
+    total = invoice['taxable'] + invoice['cgst'] + invoice['sgst']
+    lines += [
+        f"{max(invoice['taxable'], 1000):,.2f} {invoice['cgst']:,.2f} {invoice['sgst']:,.2f} 0.00 0.00",
+        f"Total Before Tax {invoice['taxable']:,.2f}",
+        f"Invoice Amount (INR) {total:,.2f}",
+        "Authorised Signatory",
+        f"Digitally signed by SYNTHETIC SIGNER Date:{invoice['date'].strftime('%Y.%m.%d')} 10:00:00 +05:30",
+    ]
+    return lines
+
+
+def write_invoice_pdf(fitz, path, lines):
+    doc = fitz.open()
+    page = doc.new_page(width=595, height=PAGE_HEIGHT)
+    y = MARGIN
+    for line in lines:
+        if y > PAGE_HEIGHT - MARGIN:
+            page = doc.new_page(width=595, height=PAGE_HEIGHT)
+            y = MARGIN
+        page.insert_text((MARGIN, y), line, fontsize=7, fontname='helv')
+        y += LINE_HEIGHT
+    doc.save(path, garbage=0, deflate=True)
+    doc.close()
+
+
+def dispatch_rows(rng, invoices, parts, total_rows, filler_start):
+    """Matching rows for every invoice (quantities split over kanbans), then filler up to total_rows."""
+    rows = []
+    for invoice in invoices:
+        for item in invoice['items']:
+            remaining = item['qty']
+            while remaining > 0:
+                qty = remaining if remaining <= 6 else rng.randrange(1, remaining)
+                rows.append((invoice['invoice_no'], item, qty))
+                remaining -= qty
+
+    filler_number = filler_start
+    while len(rows) < total_rows:
+        item = rng.choice(parts)
+        # Filler uses the previous year's series so it can never match a generated invoice.
+        rows.append((invoice_number(filler_number, '24-25'), item, rng.randrange(1, 60)))
+        filler_number += 1
+    rng.shuffle(rows)
+    return rows
+
+
+def oe_frame(pd, rng, rows, supply_date):
+    return pd.DataFrame([[inv_no, f"{supply_date:%d}N{rng.randrange(10**11, 10**12)}AC5", item['part'],
+                          item['material'], 'SYNTHETIC PART', supply_date, qty, item['packing']]
+                         for inv_no, item, qty in rows], columns=OE_COLUMNS)
+
+
+def spare_frame(pd, rng, rows):
+    return pd.DataFrame([['SPARES', VENDOR_CODE, inv_no, f"A{rng.randrange(10**10, 10**11)}", item['part'], qty,
+                          item['packing'], rng.choice(['AA', 'AB', 'BA'])]
+                         for inv_no, item, qty in rows], columns=SPARE_COLUMNS)
+
+
+def write_oe_workbook(pd, path, sheets):
+    preamble = pd.DataFrame([['', '', '', '', '', '', '', ''], ['Supply Month', '', '', '', '', '', '', '']])
+    with pd.ExcelWriter(path) as writer:
+        for sheet_name, frame in sheets:
+            # load_excel_data reads OE sheets with skiprows=2.
+            preamble.to_excel(writer, sheet_name=sheet_name, header=False, index=False)
+            frame.to_excel(writer, sheet_name=sheet_name, startrow=2, index=False)
+
+
+def write_spare_workbook(pd, path, sheets):
+    with pd.ExcelWriter(path) as writer:
+        for sheet_name, frame in sheets:
+            frame.to_excel(writer, sheet_name=sheet_name, index=False)
+
+
+def generate(output, invoices=100, rows=1000, items=3, parts=200, dispatch_date=None, extra_days=0,
+             start_number=20000, seed=42, csv=True, xlsx=True, log=print):
+    pd = get_pandas()
+    fitz = get_pymupdf()
+    if fitz is None:
+        raise RuntimeError("PyMuPDF is required to write synthetic PDFs")
+
+    rng = random.Random(seed)
+    dispatch_date = dispatch_date or datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    invoice_dir = os.path.join(output, 'Invoice')
+    excel_dir = os.path.join(output, 'Excel')
+    os.makedirs(invoice_dir, exist_ok=True)
+    os.makedirs(excel_dir, exist_ok=True)
+
+    part_list = build_parts(rng, parts)
+    invoice_list = build_invoices(rng, invoices, start_number, items, part_list, dispatch_date)
+
+    started = time.perf_counter()
+    for invoice in invoice_list:
+        write_invoice_pdf(fitz, os.path.join(invoice_dir, f"{invoice['number']}.pdf"), invoice_lines(invoice))
+    log(f"{len(invoice_list)} invoice PDF(s) in {time.perf_counter() - started:.1f}s -> {invoice_dir}")
+
+    filler_start = start_number + invoices
+    days = [dispatch_date - timedelta(days=offset) for offset in range(extra_days, -1, -1)]
+    oe_sheets, spare_sheets = [], []
+    for day in days:
+        day_invoices = invoice_list if day == dispatch_date else []
+        day_rows = dispatch_rows(rng, day_invoices, part_list, rows, filler_start)
+        filler_start += rows
+        oe_sheets.append((day.strftime('%d-%m-%Y'), oe_frame(pd, rng, day_rows, day)))
+        spare_sheets.append((day.strftime('%d-%m-%y') + ' RPDC', spare_frame(pd, rng, day_rows)))
+
+    started = time.perf_counter()
+    paths = []
+    if xlsx:
+        paths.append(os.path.join(excel_dir, 'dispatch_oe.xlsx'))
+        write_oe_workbook(pd, paths[-1], oe_sheets)
+        paths.append(os.path.join(excel_dir, 'dispatch_spare.xlsx'))
+        write_spare_workbook(pd, paths[-1], spare_sheets)
+    if csv:
+        # CSVs carry only the dispatch-date rows; OE CSVs are also read with skiprows=2.
+        paths.append(os.path.join(excel_dir, 'dispatch_oe.csv'))
+        with open(paths[-1], 'w', encoding='utf-8', newline='') as f:
+            f.write(',\nSupply Month,\n')
+            oe_sheets[-1][1].to_csv(f, index=False)
+        paths.append(os.path.join(excel_dir, 'dispatch_spare.csv'))
+        spare_sheets[-1][1].to_csv(paths[-1], index=False)
+    log(f"{len(days)} day(s) x {rows} dispatch row(s) in {time.perf_counter() - started:.1f}s -> "
+        + ", ".join(os.path.basename(path) for path in paths))
+
+    return {'invoice_dir': invoice_dir, 'excel_dir': excel_dir, 'workbooks': paths,
+            'invoices': [invoice['invoice_no'] for invoice in invoice_list]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--output', required=True, help="folder to create Invoice/ and Excel/ in")
+    parser.add_argument('--invoices', type=int, default=100)
+    parser.add_argument('--rows', type=int, default=1000, help="dispatch rows per day sheet")
+    parser.add_argument('--items', type=int, default=3, help="line items per invoice")
+    parser.add_argument('--parts', type=int, default=200, help="distinct part numbers")
+    parser.add_argument('--date', default=datetime.now().strftime('%d-%m-%Y'), help="dispatch date DD-MM-YYYY")
+    parser.add_argument('--extra-days', type=int, default=0, help="earlier day sheets filled with non-matching rows")
+    parser.add_argument('--start', type=int, default=20000, help="first invoice number")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--no-csv', action='store_true')
+    parser.add_argument('--no-xlsx', action='store_true')
+    args = parser.parse_args()
+
+    try:
+        dispatch_date = datetime.strptime(args.date, '%d-%m-%Y')
+    except ValueError:
+        print("Invalid date format. Use DD-MM-YYYY", file=sys.stderr)
+        return 2
+
+    generate(args.output, invoices=args.invoices, rows=args.rows, items=args.items, parts=args.parts,
+             dispatch_date=dispatch_date, extra_days=args.extra_days, start_number=args.start, seed=args.seed,
+             csv=not args.no_csv, xlsx=not args.no_xlsx)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,263 @@
+"""Headless batch runner for spool generation.
+
+Runs extraction, validation, matching and spool writing without Tkinter and
+prints a JSON summary, e.g.:
+
+    python -m modular_app.cli --invoices Invoice/ --workbook Excel/JAN-2026.xlsx \
+        --date 31-01-2026 --mode OE --output SpoolOutput/Original
+"""
+import argparse
+import contextlib
+import glob
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+
+if __package__ is None or __package__ == "":
+    parent_dir = os.path.dirname(os.path.abspath(__file__))
+    sys.path.insert(0, os.path.dirname(parent_dir))
+    from modular_app.services.excel_service import find_workbook_for_date
+    from modular_app.services.scheduler import JobScheduler, EVENT_DONE, EVENT_FAILED
+    from modular_app.services.timing import (invoice_timing, enable_timing_log, close_timing_log,
+                                             enable_tracing, disable_tracing, timing_log_requested,
+                                             TIMING_LOG_ENV)
+    from modular_app.services.tracing import ChromeTracer
+    from modular_app.services.cpu_profile import CallProfiler, cpu_profile_requested, CPU_PROFILE_ENV
+    from modular_app.services.prefilter import prefilter_requested, PREFILTER_ENV
+    from modular_app.pipeline import SpoolPipeline, SpoolOutputSession
+    from modular_app.services.invoice_service import VALIDATION_FULL, VALIDATION_TRIAGE
+else:
+    from .services.excel_service import find_workbook_for_date
+    from .services.scheduler import JobScheduler, EVENT_DONE, EVENT_FAILED
+    from .services.timing import (invoice_timing, enable_timing_log, close_timing_log,
+                                  enable_tracing, disable_tracing, timing_log_requested, TIMING_LOG_ENV)
+    from .services.tracing import ChromeTracer
+    from .services.cpu_profile import CallProfiler, cpu_profile_requested, CPU_PROFILE_ENV
+    from .services.prefilter import prefilter_requested, PREFILTER_ENV
+    from .pipeline import SpoolPipeline, SpoolOutputSession
+    from .services.invoice_service import VALIDATION_FULL, VALIDATION_TRIAGE
+
+EXIT_OK = 0
+EXIT_INVOICE_ERRORS = 1
+EXIT_FATAL = 2
+
+
+def get_default_output_dir(is_spare):
+    if getattr(sys, 'frozen', False):
+        base_dir = os.path.dirname(sys.executable)
+    else:
+        base_dir = os.path.dirname(os.path.abspath(__file__))
+    return os.path.join(base_dir, "SpoolOutput", "Spare" if is_spare else "Original")
+
+
+def collect_invoice_paths(sources):
+    paths = []
+    for source in sources:
+        if os.path.isdir(source):
+            matches = [os.path.join(source, name) for name in os.listdir(source)
+                       if name.lower().endswith('.pdf')]
+        else:
+            matches = glob.glob(source)
+        paths.extend(sorted(matches))
+
+    seen = set()
+    unique = []
+    for path in paths:
+        key = os.path.abspath(path)
+        if key not in seen and os.path.isfile(path):
+            seen.add(key)
+            unique.append(path)
+    return unique
+
+
+def resolve_workbook(workbook, dispatch_date):
+    if os.path.isdir(workbook):
+        return find_workbook_for_date(workbook, dispatch_date)
+    if os.path.isfile(workbook):
+        return workbook
+    return None
+
+
+def run_batch(invoice_paths, excel_path, dispatch_date, is_spare, output_folder,
+              consolidated=False, force=False, jobs=1, timeout=None, subscribers=(), keep_text=False,
+              profiler=None, validation_mode=VALIDATION_FULL, prefilter=False):
+    started = time.perf_counter()
+    summary = {
+        'dispatch_date': dispatch_date.strftime('%d-%m-%Y'),
+        'mode': 'Spare' if is_spare else 'OE',
+        'workbook': excel_path,
+        'output_folder': output_folder,
+        'consolidated_file': None,
+        'counts': {'total': len(invoice_paths), 'written': 0, 'unchanged': 0,
+                   'no_data': 0, 'skipped': 0, 'failed': 0},
+        'invoices': [],
+    }
+
+    pipeline = SpoolPipeline(is_spare, dispatch_date, keep_text=keep_text, validation_mode=validation_mode,
+                             prefilter=prefilter)
+    pipeline.load(excel_path)
+
+    scheduler = JobScheduler(concurrency=jobs, timeout=timeout)
+    for callback in subscribers:
+        scheduler.subscribe(callback)
+
+    with SpoolOutputSession(output_folder, consolidated=consolidated, force=force,
+                            spool_date=dispatch_date) as session:
+        summary['consolidated_file'] = session.consolidated_path
+        write_lock = threading.Lock()
+
+        # Each invoice is written as soon as it is loaded so at most `jobs`
+        # previews are held in memory regardless of batch size.
+        def process(inv_path):
+            with profiler.profile() if profiler else contextlib.nullcontext(), invoice_timing(inv_path):
+                preview, result = pipeline.prepare(inv_path)
+                if preview is not None:
+                    try:
+                        with write_lock:
+                            status, line_count, output_path = pipeline.write(preview, session)
+                        result.update(status=status, lines=line_count, output=output_path)
+                    except Exception as e:
+                        result.update(status='failed', stage='write', errors=[f"Failed to write file: {e}"])
+            return result
+
+        outcomes = scheduler.run_sync([(inv_path, process, inv_path) for inv_path in invoice_paths])
+
+    for inv_path, outcome in zip(invoice_paths, outcomes):
+        result = outcome['result']
+        if result is None:
+            result = {'invoice_path': inv_path, 'invoice_no': '', 'status': 'failed', 'stage': None,
+                      'errors': [outcome['error'] or outcome['status']]}
+        summary['counts'][result['status']] += 1
+        summary['invoices'].append(result)
+
+    if validation_mode == VALIDATION_TRIAGE:
+        summary['validation_seconds_saved'] = round(
+            sum(result.get('validation', {}).get('seconds_saved', 0.0) for result in summary['invoices']), 6)
+
+    summary['elapsed_seconds'] = round(time.perf_counter() - started, 3)
+    return summary
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog='spool-cli',
+        description="Generate spool files from invoice PDFs without the GUI.")
+    parser.add_argument('--invoices', nargs='+', required=True,
+                        help="invoice PDF folder(s), file(s) or glob pattern(s)")
+    parser.add_argument('--workbook', required=True,
+                        help="dispatch workbook/CSV, or a folder to search by dispatch date")
+    parser.add_argument('--date', default=datetime.now().strftime('%d-%m-%Y'),
+                        help="dispatch date as DD-MM-YYYY (default: today)")
+    parser.add_argument('--mode', choices=['OE', 'Spare'], default='OE')
+    parser.add_argument('--output', help="output folder (default: SpoolOutput/Original or Spare)")
+    parser.add_argument('--consolidated', action='store_true',
+                        help="write one daily spool file with an offset manifest; later runs on the same day "
+                             "append to it")
+    parser.add_argument('--force', action='store_true',
+                        help="rewrite spool files even when inputs are unchanged; with --consolidated, start "
+                             "the day's file afresh")
+    parser.add_argument('--summary', help="also write the JSON summary to this file")
+    parser.add_argument('--jobs', type=int, default=1, help="invoices processed concurrently (default: 1)")
+    parser.add_argument('--timeout', type=float, help="per-invoice timeout in seconds")
+    parser.add_argument('--events', action='store_true',
+                        help="print structured progress events to stderr as JSON lines")
+    parser.add_argument('--quiet', action='store_true', help="do not print progress to stderr")
+    parser.add_argument('--timing-log', metavar='FILE', default=timing_log_requested(),
+                        help="write per-invoice/per-stage timing records as JSON lines ('-' for stderr) "
+                             f"and add a p50/p95/max summary to the output (default: ${TIMING_LOG_ENV})")
+    parser.add_argument('--trace', action='store_true',
+                        help="write a Chrome trace (spool_trace_<time>.json) of every stage per invoice and "
+                             "worker to the output folder")
+    parser.add_argument('--profile', action='store_true',
+                        help="profile the batch with cProfile and write profile_cli_<time>.pstats plus a sorted "
+                             f"text summary to the output folder (also enabled by {CPU_PROFILE_ENV}=1)")
+    parser.add_argument('--triage', action='store_true',
+                        help="validate invoices cheapest check first and reject on the first failure; each "
+                             "rejected invoice reports the checks skipped and the estimated seconds saved")
+    parser.add_argument('--prefilter', action='store_true',
+                        help="skip PDFs whose invoice number (from the file name or first-page header) has no "
+                             f"rows in the workbook, without parsing them fully (also enabled by {PREFILTER_ENV}=1)")
+    parser.add_argument('--keep-text', action='store_true',
+                        help="debug: include the extracted PDF text of invoices that fail validation")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    try:
+        dispatch_date = datetime.strptime(args.date, '%d-%m-%Y')
+    except ValueError:
+        print("Invalid date format. Use DD-MM-YYYY", file=sys.stderr)
+        return EXIT_FATAL
+
+    is_spare = args.mode == 'Spare'
+    excel_path = resolve_workbook(args.workbook, dispatch_date)
+    if not excel_path:
+        print(f"No workbook found for {args.date} at {args.workbook}", file=sys.stderr)
+        return EXIT_FATAL
+
+    invoice_paths = collect_invoice_paths(args.invoices)
+    if not invoice_paths:
+        print("No invoice PDFs found", file=sys.stderr)
+        return EXIT_FATAL
+
+    def progress(event):
+        if args.events:
+            record = {key: value for key, value in event.items() if key != 'result'}
+            if event.get('result'):
+                record['status'] = event['result']['status']
+            print(json.dumps(record, default=str), file=sys.stderr)
+        elif not args.quiet and event['event'] in (EVENT_DONE, EVENT_FAILED):
+            status = event['result']['status'] if event.get('result') else event['event']
+            print(f"[{event['index'] + 1}/{event['total']}] {os.path.basename(event['task_id'])}: {status} "
+                  f"({event['duration']:.2f}s)", file=sys.stderr)
+
+    output_folder = args.output or get_default_output_dir(is_spare)
+    if args.timing_log:
+        enable_timing_log(args.timing_log)
+    if args.trace:
+        enable_tracing(ChromeTracer('spool-cli'))
+    profiler = CallProfiler('cli') if args.profile or cpu_profile_requested() else None
+    try:
+        with profiler.profile() if profiler else contextlib.nullcontext():
+            summary = run_batch(invoice_paths, excel_path, dispatch_date, is_spare, output_folder,
+                                consolidated=args.consolidated, force=args.force, jobs=args.jobs,
+                                timeout=args.timeout, subscribers=[progress], keep_text=args.keep_text,
+                                profiler=profiler,
+                                validation_mode=VALIDATION_TRIAGE if args.triage else VALIDATION_FULL,
+                                prefilter=args.prefilter or prefilter_requested())
+    except Exception as e:
+        print(f"Batch failed: {e}", file=sys.stderr)
+        return EXIT_FATAL
+    finally:
+        timing_summary = close_timing_log() if args.timing_log else None
+        tracer = disable_tracing()
+    if timing_summary:
+        summary['timing'] = timing_summary
+    if tracer:
+        os.makedirs(output_folder, exist_ok=True)
+        trace_name = f"spool_trace_{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+        summary['trace_file'] = tracer.save(os.path.join(output_folder, trace_name))
+        if not args.quiet:
+            print(f"Trace written to {summary['trace_file']}", file=sys.stderr)
+    if profiler:
+        summary['profile_stats'], summary['profile_file'] = profiler.save(output_folder)
+        if not args.quiet:
+            print(f"Profile written to {summary['profile_file']}", file=sys.stderr)
+
+    summary_json = json.dumps(summary, indent=2, default=str)
+    if args.summary:
+        with open(args.summary, 'w', encoding='utf-8') as f:
+            f.write(summary_json)
+    print(summary_json)
+
+    counts = summary['counts']
+    return EXIT_INVOICE_ERRORS if counts['failed'] else EXIT_OK
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -22,6 +22,35 @@ COLUMNS = [
 
 LINE_LENGTH = 390
 
+# (field, start, end) column ranges of a spool line; generate_spool_line writes each field into its range.
+# Unused gaps are listed as 'blank' so the ranges cover the whole line.
+SPOOL_LAYOUT = [
+    ("vendor_code", 0, 4),
+    ("challan_no", 4, 20),
+    ("challan_date", 20, 31),
+    ("invoice_no", 31, 47),
+    ("invoice_date", 47, 71),
+    ("blank", 71, 82),
+    ("oe_prefix", 82, 83),
+    ("schedule_no", 83, 98),
+    ("item_code", 98, 113),
+    ("qty", 113, 125),
+    ("po_number", 125, 138),
+    ("bin_qty", 138, 150),
+    ("blank", 150, 194),
+    ("batch_no", 194, 204),
+    ("gst_no", 204, 219),
+    ("hsn_code", 219, 227),
+    ("cgst_amt", 227, 243),
+    ("sgst_amt", 243, 265),
+    ("blank", 265, 275),
+    ("eway_bill", 275, 276),
+    ("igst_amt", 276, 290),
+    ("irn_number", 290, 354),
+    ("basic_price", 354, 366),
+    ("total_value", 366, 390),
+]
+
 DATE_INPUT_FORMATS = [
     '%d-%b-%y',
     '%d-%b-%Y',
@@ -1,16 +1,26 @@
+import contextlib
+import logging
 import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import tkinter as tk
 from tkinter import messagebox, filedialog
 
-import pandas as pd
-
 from .utils import get_initial_dir
-from .services.invoice_service import extract_invoice_data, get_invoice_item, validate_invoice_integrity
-from .services.excel_service import load_excel_data
-from .services.validation_service import validate_required_fields, validate_preview_rows
-from .services.spool_service import generate_spool_line
+from .services.excel_service import find_workbook_for_date
+from .services.spool_service import write_spool_file, spool_filename
+from .pipeline import SpoolPipeline, SpoolOutputSession
+from .services.timing import stage
+from .services.memory_profile import MemoryProfiler, memory_profile_requested
+from .services.cpu_profile import CallProfiler, cpu_profile_requested
+from .services.prefilter import prefilter_requested
+
+UI_POLL_MS = 50
 
+logger = logging.getLogger('spool.app')
 
 class SpoolAppController:
     def __init__(self, root, view):
@@ -30,7 +40,6 @@ class SpoolAppController:
         self.invoice_paths = []
         self.excel_path = None
         self.invoice_data = {}
-        self.invoice_line_items = {}
         self.preview_data = []
         self.selected_date = None
 
@@ -38,6 +47,15 @@ class SpoolAppController:
         self.all_previews = []
         self.current_preview_index = 0
 
+        # Background work: one worker thread, results marshalled back via root.after
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='spool-ui-worker')
+        self._ui_queue = queue.Queue()
+        self._cancel_event = threading.Event()
+        self._busy = False
+        self._progress_started = None
+        self._memory_profiler = None
+        self._cpu_profiler = None
+
     def get_today(self):
         return datetime.now().strftime('%d-%m-%Y')
 
@@ -88,41 +106,7 @@ class SpoolAppController:
             messagebox.showerror("Error", f"Directory not found: {search_dir}")
             return
 
-        date_patterns = [
-            self.selected_date.strftime('%d-%m-%Y'),
-            self.selected_date.strftime('%d-%m-%y'),
-            self.selected_date.strftime('%d/%m/%Y'),
-            self.selected_date.strftime('%Y-%m-%d'),
-        ]
-
-        found_file = None
-        for filename in os.listdir(search_dir):
-            filepath = os.path.join(search_dir, filename)
-            if os.path.isfile(filepath):
-                filename_upper = filename.upper()
-                for pattern in date_patterns:
-                    if pattern.upper() in filename_upper:
-                        found_file = filepath
-                        break
-            if found_file:
-                break
-
-        if not found_file:
-            month_patterns = [
-                self.selected_date.strftime('%b-%Y').upper(),
-                self.selected_date.strftime('%B-%Y').upper(),
-                self.selected_date.strftime('%m-%Y'),
-            ]
-            for filename in os.listdir(search_dir):
-                filepath = os.path.join(search_dir, filename)
-                if os.path.isfile(filepath) and filename.lower().endswith(('.xlsx', '.xls')):
-                    filename_upper = filename.upper()
-                    for pattern in month_patterns:
-                        if pattern in filename_upper:
-                            found_file = filepath
-                            break
-                if found_file:
-                    break
+        found_file = find_workbook_for_date(search_dir, self.selected_date)
 
         if found_file:
             self.excel_path = found_file
@@ -138,30 +122,113 @@ class SpoolAppController:
                 "• OE/Spare selection matches your workbook location")
             self.view.set_status(f"✗ Workbook not found for {self.selected_date.strftime('%d-%m-%Y')}", 'error')
 
-    def _extract_invoice_data(self):
-        if not self.invoice_path:
-            return False
-        try:
-            invoice_data, invoice_line_items, validation_info = extract_invoice_data(self.invoice_path)
-            self.invoice_data = invoice_data
-            self.invoice_line_items = invoice_line_items
-            self.invoice_validation_info = validation_info
-            return True
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to read invoice: {e}")
-            return False
+    def _is_spare(self):
+        return self.view.get_oe_spares() == "Spare"
 
-    def _load_excel_data(self):
-        if not self.excel_path:
-            return None
+    def _run_in_background(self, work, on_done, total):
+        self._busy = True
+        self._cancel_event.clear()
+        self._progress_started = time.perf_counter()
+        self.view.set_busy(True)
+        self.view.set_progress(0, total, f"0/{total}")
+
+        future = self._executor.submit(self._run_profiled, work)
+        future.add_done_callback(lambda f: self._post(self._finish_background, f, on_done))
+        self.root.after(UI_POLL_MS, self._drain_ui_queue)
+
+    def _run_profiled(self, work):
+        with self._cpu_profiling():
+            return work()
+
+    def _post(self, callback, *args):
+        self._ui_queue.put((callback, args))
+
+    def _drain_ui_queue(self):
+        while True:
+            try:
+                callback, args = self._ui_queue.get_nowait()
+            except queue.Empty:
+                break
+            callback(*args)
+        if self._busy:
+            self.root.after(UI_POLL_MS, self._drain_ui_queue)
+
+    def _finish_background(self, future, on_done):
+        self._busy = False
+        self.view.set_busy(False)
+        self.update_nav_buttons()
         try:
-            is_spare = self.view.get_oe_spares() == "Spare"
-            return load_excel_data(self.excel_path, is_spare, self.selected_date)
+            outcome = future.result()
         except Exception as e:
-            messagebox.showerror("Error", f"Failed to read Excel: {e}")
-            return None
+            self.view.reset_progress()
+            self.view.set_status(f"Failed: {e}", "error")
+            messagebox.showerror("Error", f"Unexpected error: {e}")
+            self._finish_profiles()
+            return
+        with self._cpu_profiling():
+            on_done(outcome)
+        self._finish_profiles()
+
+    def _start_profiles(self, name):
+        if memory_profile_requested():
+            self._memory_profiler = MemoryProfiler(name).start()
+        if cpu_profile_requested() or self.view.get_profiling_enabled():
+            self._cpu_profiler = CallProfiler(name)
+
+    def _cpu_profiling(self):
+        """Context manager profiling the current thread's share of the running action, if profiling."""
+        profiler = self._cpu_profiler
+        return profiler.profile() if profiler is not None else contextlib.nullcontext()
+
+    def _finish_profiles(self):
+        self._finish_memory_profile()
+        profiler, self._cpu_profiler = self._cpu_profiler, None
+        if profiler is None:
+            return
+        try:
+            _, text_path = profiler.save(os.path.join(self.output_dir, "Profiles"))
+            logger.info("CPU profile written to %s", text_path)
+        except OSError as e:
+            logger.warning("Failed to write CPU profile: %s", e)
+
+    def _memory_checkpoint(self, stage_name):
+        if self._memory_profiler is not None:
+            self._memory_profiler.checkpoint(stage_name)
+
+    def _finish_memory_profile(self, stage_name='ui'):
+        profiler, self._memory_profiler = self._memory_profiler, None
+        if profiler is None:
+            return
+        try:
+            profiler.checkpoint(stage_name)
+            path = profiler.save(os.path.join(self.output_dir, "Profiles"))
+            logger.info("Memory profile written to %s", path)
+        except OSError as e:
+            logger.warning("Failed to write memory profile: %s", e)
+        finally:
+            profiler.stop()
+
+    def _report_progress(self, current, total, message):
+        self._post(self._show_progress, current, total, message)
+
+    def _show_progress(self, current, total, message):
+        text = f"{current}/{total}"
+        elapsed = time.perf_counter() - self._progress_started
+        if current and elapsed > 0:
+            rate = current / elapsed
+            eta = int((total - current) / rate)
+            text += f"  |  {rate:.1f} inv/s  |  ETA {eta // 60:02d}:{eta % 60:02d}"
+        self.view.set_progress(current, total, text)
+        self.view.set_status(message)
+
+    def cancel_operation(self):
+        if self._busy and not self._cancel_event.is_set():
+            self._cancel_event.set()
+            self.view.set_status("Cancelling after the current invoice...")
 
     def load_preview(self):
+        if self._busy:
+            return
         if not self.invoice_path and not self.invoice_paths:
             messagebox.showwarning("Warning", "Please select Invoice PDF(s) first!")
             return
@@ -169,171 +236,73 @@ class SpoolAppController:
             messagebox.showwarning("Warning", "Please select an Excel/CSV file first!")
             return
 
-        invoices_to_load = self.invoice_paths if self.invoice_paths else [self.invoice_path]
+        invoices_to_load = list(self.invoice_paths) if self.invoice_paths else [self.invoice_path]
+        total = len(invoices_to_load)
+        pipeline = SpoolPipeline(self._is_spare(), self.selected_date, prefilter=prefilter_requested())
+        excel_path = self.excel_path
+
+        self.view.set_status(f"Loading {total} invoice(s)...")
+        self._start_profiles('load_preview')
 
-        self.view.set_status(f"Loading {len(invoices_to_load)} invoice(s)...")
-        self.root.update()
+        def work():
+            try:
+                pipeline.load(excel_path)
+            except Exception as e:
+                return {'excel_error': str(e)}
+            self._memory_checkpoint('workbook_load')
 
-        excel_df = self._load_excel_data()
-        if excel_df is None:
+            previews = []
+            results = []
+            for inv_idx, inv_path in enumerate(invoices_to_load):
+                if self._cancel_event.is_set():
+                    break
+                preview, result = pipeline.load_invoice(inv_path)
+                if preview is not None:
+                    previews.append(preview)
+                results.append(result)
+                self._report_progress(inv_idx + 1, total, f"Loading invoice {inv_idx + 1}/{total}...")
+            self._memory_checkpoint('invoices')
+            return {'previews': previews, 'results': results, 'total': total,
+                    'cancelled': self._cancel_event.is_set()}
+
+        self._run_in_background(work, self._on_previews_loaded, total)
+
+    def _on_previews_loaded(self, outcome):
+        if 'excel_error' in outcome:
+            self.view.reset_progress()
+            messagebox.showerror("Error", f"Failed to read Excel: {outcome['excel_error']}")
             return
 
-        self.all_previews = []
+        results = outcome['results']
+        if results:
+            self.invoice_path = results[-1]['invoice_path']
+
+        self.all_previews = outcome['previews']
         self.current_preview_index = 0
 
         validation_failures = []
         no_data_failures = []
+        other_errors = []
+        prefiltered = []
 
-        is_spare = self.view.get_oe_spares() == "Spare"
-
-        part_col = 'PART NUMBER'
-        schedule_col = 'DI NUMBER' if is_spare else 'KANBAN NO'
-        qty_col = 'SCHEDULED QUANTITY' if is_spare else 'QTY REQ'
-        packing_col = 'PACKING STANDERD'
-        batch_col = 'LATEST BATCH CODE' if is_spare else None
-
-        for inv_idx, inv_path in enumerate(invoices_to_load):
-            self.view.set_status(f"Loading invoice {inv_idx + 1}/{len(invoices_to_load)}...")
-            self.root.update()
-
-            self.invoice_path = inv_path
-            if not self._extract_invoice_data():
-                continue
-
-            is_valid, validation_errors = validate_invoice_integrity(self.invoice_data, self.invoice_validation_info)
-            if not is_valid:
-                inv_filename = os.path.basename(inv_path)
-                validation_failures.append((inv_filename, validation_errors))
-                continue
-
-            inv_num = self.invoice_data.get('invoice_no', '').strip()
-            if not inv_num:
-                continue
-
-            if 'INVOICE NO' not in excel_df.columns:
-                continue
-
-            matching = excel_df[excel_df['INVOICE NO'].astype(str).str.strip() == inv_num]
-
-            if is_spare:
-                if 'DI NUMBER' in matching.columns:
-                    matching = matching[matching['DI NUMBER'].notna()]
-            else:
-                if 'KANBAN NO' in matching.columns:
-                    matching = matching[matching['KANBAN NO'].notna()]
-
-            valid_rows = []
-            for _, row in matching.iterrows():
-                part_number = str(row.get(part_col, '')) if pd.notna(row.get(part_col)) else ''
-                if get_invoice_item(part_number, self.invoice_line_items):
-                    valid_rows.append(row)
-
-            if not valid_rows:
-                no_data_failures.append(f"{os.path.basename(inv_path)} ({inv_num})")
-                continue
-
-            excel_qty_by_part = {}
-            for row in valid_rows:
-                part_number = str(row.get(part_col, '')) if pd.notna(row.get(part_col)) else ''
-                if not part_number:
-                    continue
-
-                excel_qty_val = row.get(qty_col, 0)
-                try:
-                    excel_qty = int(float(excel_qty_val)) if pd.notna(excel_qty_val) and excel_qty_val else 0
-                except (ValueError, TypeError):
-                    excel_qty = 0
-
-                if part_number in excel_qty_by_part:
-                    excel_qty_by_part[part_number] += excel_qty
-                else:
-                    excel_qty_by_part[part_number] = excel_qty
-
-            qty_mismatches = []
-            for part_number, total_excel_qty in excel_qty_by_part.items():
-                invoice_item = get_invoice_item(part_number, self.invoice_line_items)
-                if invoice_item:
-                    invoice_qty_str = invoice_item.get('qty', '0')
-                    try:
-                        invoice_qty = int(float(invoice_qty_str)) if invoice_qty_str else 0
-                    except (ValueError, TypeError):
-                        invoice_qty = 0
-
-                    if invoice_qty != total_excel_qty:
-                        qty_mismatches.append({
-                            'part': part_number,
-                            'invoice_qty': invoice_qty,
-                            'excel_qty': total_excel_qty
-                        })
-
-            if qty_mismatches:
-                inv_name = os.path.basename(inv_path)
-                error_lines = [f"Invoice: {inv_name}", "", "Quantity Mismatches Found:", ""]
-                for mismatch in qty_mismatches:
-                    error_lines.append(f"Part: {mismatch['part']}")
-                    error_lines.append(f"  Invoice Qty: {mismatch['invoice_qty']}")
-                    error_lines.append(f"  Nagare Qty: {mismatch['excel_qty']}")
-                    error_lines.append("")
-
-                messagebox.showerror("Quantity Mismatch", "\n".join(error_lines))
+        for result in results:
+            if result['status'] == 'loaded':
                 continue
-
-            preview_data = []
-            for idx, row in enumerate(valid_rows):
-                part_number = str(row.get(part_col, ''))
-                invoice_item = get_invoice_item(part_number, self.invoice_line_items)
-
-                unload_no = f"{datetime.now().strftime('%Y%m%d')}{idx+1:02d}"
-                schedule_no = str(row.get(schedule_col, '')) if pd.notna(row.get(schedule_col)) else ''
-                qty_val = row.get(qty_col, 0)
-                qty = str(int(float(qty_val))) if pd.notna(qty_val) and qty_val else ''
-                pack_val = row.get(packing_col, 0)
-                bin_qty = str(int(float(pack_val))) if pd.notna(pack_val) and pack_val else ''
-                batch_no = ''
-                if is_spare and batch_col and batch_col in row.index:
-                    batch_val = row.get(batch_col, '')
-                    batch_no = str(batch_val) if pd.notna(batch_val) else ''
-
-                row_data = {
-                    'unload_no': unload_no,
-                    'schedule_no': schedule_no,
-                    'item_code': part_number,
-                    'qty': qty,
-                    'po_number': self.invoice_data.get('po_number', ''),
-                    'f57_2no': '',
-                    'bin_qty': bin_qty,
-                    'remarks': '',
-                    'batch_no': batch_no,
-                    'location': '',
-                    'gst_no': self.invoice_data.get('gst_no', ''),
-                    'hsn_code': invoice_item.get('hsn_code', '') if invoice_item else '',
-                    'cgst_amt': self.invoice_data.get('cgst_amt', ''),
-                    'sgst_amt': self.invoice_data.get('sgst_amt', ''),
-                    'igst_amt': self.invoice_data.get('igst_amt', ''),
-                    'eway_bill': self.invoice_data.get('eway_bill', '0'),
-                    'basic_price': invoice_item.get('rate', '') if invoice_item else '',
-                    'total_value': self.invoice_data.get('total_value', ''),
-                    'tool_amort': '0',
-                }
-                preview_data.append(row_data)
-
-            header_data = {
-                'invoice_no': self.invoice_data.get('invoice_no', ''),
-                'invoice_date': self.invoice_data.get('invoice_date', ''),
-                'vendor_code': self.invoice_data.get('vendor_code', ''),
-                'po_number': self.invoice_data.get('po_number', ''),
-                'gst_no': self.invoice_data.get('gst_no', ''),
-                'challan_no': self.invoice_data.get('invoice_no', ''),
-                'challan_date': self.invoice_data.get('invoice_date', ''),
-            }
-
-            self.all_previews.append({
-                'invoice_path': inv_path,
-                'invoice_data': dict(self.invoice_data),
-                'invoice_line_items': dict(self.invoice_line_items),
-                'header_data': header_data,
-                'preview_data': preview_data,
-            })
+            failed_stage = result['stage']
+            if failed_stage == 'validate':
+                validation_failures.append((os.path.basename(result['invoice_path']), result['errors']))
+            elif failed_stage in ('extract', 'reconcile'):
+                other_errors.append(result['errors'][0])
+            elif result['status'] == 'no_data':
+                no_data_failures.append(result['errors'][0])
+                if failed_stage == 'prefilter':
+                    prefiltered.append(result['errors'][0])
+
+        if other_errors:
+            error_msg = "\n\n".join(other_errors[:3])
+            if len(other_errors) > 3:
+                error_msg += f"\n\n... and {len(other_errors) - 3} more invoice(s)"
+            messagebox.showerror("Invoice Load Errors", error_msg)
 
         if validation_failures:
             error_parts = []
@@ -346,6 +315,10 @@ class SpoolAppController:
 
             messagebox.showerror("Invoice Validation Failed", full_error_msg)
 
+        if not self.all_previews and outcome['cancelled']:
+            self.view.set_status("Load cancelled", "error")
+            return
+
         if not self.all_previews:
             if validation_failures and not no_data_failures:
                 self.view.set_status("All invoices failed validation", "error")
@@ -372,7 +345,13 @@ class SpoolAppController:
         self.show_current_preview()
         self.update_nav_buttons()
 
-        self.view.set_status(f"✓ Loaded {len(self.all_previews)} invoice(s) successfully. Quantities verified.", "success")
+        if outcome['cancelled']:
+            self.view.set_status(f"Cancelled - loaded {len(self.all_previews)} of {outcome['total']} invoice(s)", "error")
+        else:
+            message = f"✓ Loaded {len(self.all_previews)} invoice(s) successfully. Quantities verified."
+            if prefiltered:
+                message += f" Skipped {len(prefiltered)} PDF(s) with no rows in the workbook."
+            self.view.set_status(message, "success")
 
     def show_current_preview(self):
         if not self.all_previews or self.current_preview_index >= len(self.all_previews):
@@ -381,16 +360,15 @@ class SpoolAppController:
         current = self.all_previews[self.current_preview_index]
 
         self.invoice_data = current['invoice_data']
-        self.invoice_line_items = current['invoice_line_items']
         self.preview_data = current['preview_data']
 
         header_data = current['header_data']
         combined = dict(header_data)
         for key in self.invoice_data:
             combined.setdefault(key, self.invoice_data[key])
-        self.view.set_header_values(combined)
-
-        self.view.set_table_rows(self.preview_data)
+        with stage('ui_render'):
+            self.view.set_header_values(combined)
+            self.view.set_table_rows(self.preview_data)
 
         inv_no = self.invoice_data.get('invoice_no', 'Unknown')
         self.view.set_preview_label(f"Invoice {self.current_preview_index + 1} of {len(self.all_previews)}: {inv_no}")
@@ -420,38 +398,55 @@ class SpoolAppController:
         if not self.all_previews or self.current_preview_index >= len(self.all_previews):
             return
 
-        updated_preview = self.view.get_table_rows()
-        self.all_previews[self.current_preview_index]['preview_data'] = updated_preview
-
-        header_values = self.view.get_header_values()
-        self.all_previews[self.current_preview_index]['header_data'].update(header_values)
-
-    def generate_spool_line(self, row_data):
-        header_values = self.view.get_header_values()
-        is_spare = self.view.get_oe_spares() == "Spare"
-        return generate_spool_line(row_data, header_values, self.invoice_data, is_spare)
-
-    def _validate_headers(self):
-        header_values = self.view.get_header_values()
-        return validate_required_fields(header_values, self.invoice_data)
-
-    def _validate_rows(self, preview_data):
-        is_spare = self.view.get_oe_spares() == "Spare"
-        return validate_preview_rows(preview_data, is_spare)
+        current = self.all_previews[self.current_preview_index]
+        for (row_index, col_id), value in self.view.get_dirty_cells().items():
+            current['preview_data'][row_index][col_id] = value
+        current['header_data'].update(self.view.get_dirty_headers())
+        self.view.clear_dirty()
+
+    def _get_spool_date(self):
+        if self.selected_date:
+            return self.selected_date
+        try:
+            return datetime.strptime(self.view.get_dispatch_date(), '%d-%m-%Y')
+        except ValueError:
+            return datetime.now()
 
     def generate_all_spool(self):
+        if self._busy:
+            return
+        self._start_profiles('generate_all_spool')
+        try:
+            with self._cpu_profiling():
+                self._generate_all_spool()
+        finally:
+            # Background generation finishes the profiles in _finish_background.
+            if not self._busy:
+                self._finish_profiles()
+
+    def _generate_all_spool(self):
         self.save_current_preview_edits()
 
         if not self.all_previews:
             messagebox.showwarning("Warning", "No previews loaded!\nSelect invoice(s) and click 'Load Preview' first.")
             return
 
+        is_spare = self._is_spare()
+        pipeline = SpoolPipeline(is_spare, self.selected_date)
+
+        batch = pipeline.validate_batch(self.all_previews)
+
         validation_errors = []
-        for idx, preview in enumerate(self.all_previews):
-            is_valid, error_msg = self._validate_headers()
-            if not is_valid:
-                inv_no = preview.get('invoice_data', {}).get('invoice_no', f'Invoice {idx+1}')
-                validation_errors.append(f"{inv_no}:\n{error_msg}")
+        row_validation_errors = []
+        for idx, (preview, checked) in enumerate(zip(self.all_previews, batch)):
+            inv_no = preview.get('invoice_data', {}).get('invoice_no', f'Invoice {idx+1}')
+            if checked['header_error']:
+                validation_errors.append(f"{inv_no}:\n{checked['header_error']}")
+            row_errors = checked['row_errors']
+            if row_errors:
+                row_validation_errors.append(f"{inv_no}:\n• " + "\n• ".join(row_errors[:3]))
+                if len(row_errors) > 3:
+                    row_validation_errors[-1] += f"\n  ... and {len(row_errors) - 3} more row(s)"
 
         if validation_errors:
             error_display = "\n\n".join(validation_errors[:5])
@@ -460,27 +455,20 @@ class SpoolAppController:
             messagebox.showerror("Header Validation Error", f"Cannot generate spool files.\n\n{error_display}")
             return
 
-        row_validation_errors = []
-        for idx, preview in enumerate(self.all_previews):
-            is_valid, row_errors = self._validate_rows(preview['preview_data'])
-            if not is_valid:
-                inv_no = preview.get('invoice_data', {}).get('invoice_no', f'Invoice {idx+1}')
-                row_validation_errors.append(f"{inv_no}:\n• " + "\n• ".join(row_errors[:3]))
-                if len(row_errors) > 3:
-                    row_validation_errors[-1] += f"\n  ... and {len(row_errors) - 3} more row(s)"
-
         if row_validation_errors:
             error_display = "\n\n".join(row_validation_errors[:3])
             if len(row_validation_errors) > 3:
                 error_display += f"\n\n... and {len(row_validation_errors) - 3} more invoice(s) with row errors"
             messagebox.showerror("Row Data Validation Error", f"Cannot generate spool files - missing required row data.\n\n{error_display}")
             return
+        self._memory_checkpoint('validate')
 
-        is_spare = self.view.get_oe_spares() == "Spare"
         default_output = os.path.join(self.output_dir, "Spare" if is_spare else "Original")
         os.makedirs(default_output, exist_ok=True)
 
-        if len(self.all_previews) == 1:
+        consolidated = self.view.get_consolidated_output()
+
+        if len(self.all_previews) == 1 and not consolidated:
             preview = self.all_previews[0]
             inv_no = preview['invoice_data'].get('invoice_no', '').strip()
 
@@ -488,12 +476,10 @@ class SpoolAppController:
                 messagebox.showerror("Error", "Invoice number is required!")
                 return
 
-            default_filename = inv_no.split('/')[-1] if '/' in inv_no else inv_no
-
             output_path = filedialog.asksaveasfilename(
                 title="Save Spool File",
                 initialdir=default_output,
-                initialfile=f"{default_filename}.txt",
+                initialfile=spool_filename(inv_no),
                 defaultextension=".txt",
                 filetypes=[("Text files", "*.txt"), ("All files", "*.*")]
             )
@@ -501,19 +487,10 @@ class SpoolAppController:
             if not output_path:
                 return
 
-            lines = []
-            for row_data in preview['preview_data']:
-                self.invoice_data = preview['invoice_data']
-                header_data = preview['header_data']
-                self.view.set_header_values(header_data)
-
-                line = self.generate_spool_line(row_data)
-                lines.append(line)
-
             try:
-                with open(output_path, 'w', encoding='utf-8') as f:
-                    for line in lines:
-                        f.write(line + '\n')
+                lines = pipeline.format(preview)
+                write_spool_file(output_path, lines)
+                self._memory_checkpoint('write')
 
                 messagebox.showinfo("Success", f"Spool file saved:\n{output_path}\n\n{len(lines)} line(s) written.")
                 self.view.set_status(f"Saved: {os.path.basename(output_path)} ({len(lines)} lines)")
@@ -528,57 +505,62 @@ class SpoolAppController:
             if not output_folder:
                 return
 
-            success_count = 0
-            error_count = 0
-            error_invoices = []
-
-            self.view.set_status(f"Generating {len(self.all_previews)} spool files...")
-            self.root.update()
-
-            for idx, preview in enumerate(self.all_previews):
-                try:
-                    inv_data = preview['invoice_data']
-                    inv_no = inv_data.get('invoice_no', '').strip()
-
-                    if not inv_no:
-                        error_count += 1
-                        error_invoices.append(f"Invoice {idx+1} (no invoice number)")
-                        continue
-
-                    self.view.set_status(f"Generating {idx+1}/{len(self.all_previews)}: {inv_no}")
-                    self.root.update()
-
-                    self.invoice_data = preview['invoice_data']
-                    self.view.set_header_values(preview['header_data'])
-
-                    lines = []
-                    for row_data in preview['preview_data']:
-                        line = self.generate_spool_line(row_data)
-                        lines.append(line)
-
-                    default_filename = inv_no.split('/')[-1] if '/' in inv_no else inv_no
-                    output_path = os.path.join(output_folder, f"{default_filename}.txt")
-
-                    with open(output_path, 'w', encoding='utf-8') as f:
-                        for line in lines:
-                            f.write(line + '\n')
-
-                    success_count += 1
-
-                except Exception as e:
-                    error_count += 1
-                    error_invoices.append(f"Invoice {idx+1} ({str(e)})")
+            previews = list(self.all_previews)
+            total = len(previews)
+            session = SpoolOutputSession(output_folder, consolidated=consolidated, spool_date=self._get_spool_date())
+            try:
+                session.open()
+            except Exception as e:
+                messagebox.showerror("Error", f"Failed to create spool output: {e}")
+                return
 
-            self.show_current_preview()
+            self.view.set_status(f"Generating {total} spool files...")
 
-            summary = f"Generation Complete!\n\nSuccess: {success_count}\nErrors: {error_count}"
-            if error_invoices:
-                summary += f"\n\nFailed invoices:\n" + "\n".join(error_invoices[:10])
-                if len(error_invoices) > 10:
-                    summary += f"\n... and {len(error_invoices) - 10} more"
+            def progress(current, total, inv_no):
+                self._report_progress(current, total, f"Generating {current}/{total}: {inv_no}")
 
-            messagebox.showinfo("Generation Complete", summary)
-            self.view.set_status(f"Generated: {success_count} success, {error_count} errors")
+            def work():
+                try:
+                    run = pipeline.generate(previews, session, progress, cancel_event=self._cancel_event)
+                    self._memory_checkpoint('write')
+                finally:
+                    try:
+                        session.close()
+                    except OSError as e:
+                        self._post(messagebox.showwarning, "Warning", f"Failed to save regeneration manifest: {e}")
+                self._memory_checkpoint('close')
+                return run
+
+            def on_done(run):
+                self._on_spool_generated(run, session)
+
+            self._run_in_background(work, on_done, total)
+
+    def _on_spool_generated(self, run, session):
+        counts = run['counts']
+        error_invoices = [f"Invoice {result['index']+1} ({result['errors'][0]})"
+                          for result in run['invoices'] if result['status'] == 'failed']
+
+        if session.consolidated:
+            summary = (f"Generation Complete!\n\nSuccess: {counts['written']}\n"
+                       f"Skipped (already in file): {counts['skipped']}\nErrors: {counts['failed']}"
+                       f"\n\nConsolidated file: {os.path.basename(session.consolidated_path)}"
+                       f"\n{session.consolidated_lines_written} line(s) written"
+                       f" ({session.consolidated_line_count} in file)")
+        else:
+            summary = (f"Generation Complete!\n\nRewritten: {counts['written']}\n"
+                       f"Skipped (unchanged): {counts['unchanged']}\nErrors: {counts['failed']}")
+        if run['cancelled']:
+            summary = summary.replace("Generation Complete!", "Generation Cancelled!", 1)
+            summary += f"\n\nNot processed: {run['total'] - len(run['invoices'])}"
+        if error_invoices:
+            summary += f"\n\nFailed invoices:\n" + "\n".join(error_invoices[:10])
+            if len(error_invoices) > 10:
+                summary += f"\n... and {len(error_invoices) - 10} more"
+
+        messagebox.showinfo("Generation Cancelled" if run['cancelled'] else "Generation Complete", summary)
+        self.view.set_status(f"Generated: {counts['written']} written, {counts['unchanged']} unchanged, "
+                             f"{counts['failed']} errors")
 
     def save_changes(self):
         self.save_current_preview_edits()
@@ -596,7 +578,6 @@ class SpoolAppController:
         self.excel_path = None
         self.preview_data = []
         self.invoice_data = {}
-        self.invoice_line_items = {}
         self.all_previews = []
         self.current_preview_index = 0
 
@@ -611,4 +592,6 @@ class SpoolAppController:
             messagebox.showwarning("Warning", "Output directory does not exist!")
 
     def close(self):
+        self._cancel_event.set()
+        self._executor.shutdown(wait=False)
         self.root.quit()
@@ -8,12 +8,21 @@ if __package__ is None or __package__ == "":
     sys.path.insert(0, os.path.dirname(parent_dir))
     from modular_app.ui.view import SpoolAppView
     from modular_app.controller import SpoolAppController
+    from modular_app.services.lazy_imports import start_warm_up
+    from modular_app.services.timing import enable_timing_log, close_timing_log, timing_log_requested
 else:
     from .ui.view import SpoolAppView
     from .controller import SpoolAppController
+    from .services.lazy_imports import start_warm_up
+    from .services.timing import enable_timing_log, close_timing_log, timing_log_requested
 
 
 def main():
+    # Pipeline stages and the preview's Tk render ('ui_render') go to the same JSON timing log as the CLI's.
+    timing_log = timing_log_requested()
+    if timing_log:
+        enable_timing_log(timing_log)
+
     root = tk.Tk()
     root.title("Spool File Generator (GST) v2")
     root.geometry("1400x800")
@@ -30,6 +39,7 @@ def main():
         'view_output': lambda: controller.view_output(),
         'prev_preview': lambda: controller.prev_preview(),
         'next_preview': lambda: controller.next_preview(),
+        'cancel': lambda: controller.cancel_operation(),
         'close': lambda: controller.close(),
         'get_today': lambda: datetime.now().strftime('%d-%m-%Y'),
     }
@@ -37,7 +47,14 @@ def main():
     view = SpoolAppView(root, callbacks)
     controller = SpoolAppController(root, view)
 
-    root.mainloop()
+    # pandas/pdfplumber/PyMuPDF load on first use; start importing them once the window is drawn.
+    root.after_idle(start_warm_up)
+
+    try:
+        root.mainloop()
+    finally:
+        if timing_log:
+            close_timing_log()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,75 @@
+from .config import COLUMNS
+
+COLUMN_IDS = tuple(col[0] for col in COLUMNS)
+
+
+class PreviewRow:
+    """One preview row, with a fixed slot per COLUMNS entry.
+
+    Supports the dict operations the rest of the app uses on rows (row[key],
+    get, keys, items, dict(row)) without a per-row hash table, which is most
+    of the memory a 19-key dict costs once thousands of rows are loaded.
+    """
+
+    __slots__ = COLUMN_IDS
+
+    def __init__(self, values=None, **fields):
+        for col_id in COLUMN_IDS:
+            object.__setattr__(self, col_id, '')
+        if values:
+            self.update(values)
+        if fields:
+            self.update(fields)
+
+    def __getitem__(self, key):
+        if key not in COLUMN_IDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        if key not in COLUMN_IDS:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __contains__(self, key):
+        return key in COLUMN_IDS
+
+    def __iter__(self):
+        return iter(COLUMN_IDS)
+
+    def __len__(self):
+        return len(COLUMN_IDS)
+
+    def __eq__(self, other):
+        if isinstance(other, PreviewRow):
+            return self.values() == other.values()
+        if isinstance(other, dict):
+            return self.to_dict() == other
+        return NotImplemented
+
+    def __repr__(self):
+        return f"PreviewRow({self.to_dict()!r})"
+
+    def get(self, key, default=None):
+        if key not in COLUMN_IDS:
+            return default
+        return getattr(self, key)
+
+    def keys(self):
+        return COLUMN_IDS
+
+    def values(self):
+        return [getattr(self, col_id) for col_id in COLUMN_IDS]
+
+    def items(self):
+        return [(col_id, getattr(self, col_id)) for col_id in COLUMN_IDS]
+
+    def update(self, values):
+        for key, value in dict(values).items():
+            self[key] = value
+
+    def copy(self):
+        return PreviewRow(self)
+
+    def to_dict(self):
+        return dict(self.items())
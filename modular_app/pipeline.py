@@ -0,0 +1,306 @@
+import os
+
+from .services.invoice_service import (extract_invoice_data, validate_invoice_integrity, VALIDATION_FULL,
+                                       VALIDATION_TRIAGE)
+from .services.excel_service import load_excel_data
+from .services.matching_service import (
+    index_dispatch_rows, find_dispatch_rows, match_invoice_rows, find_qty_mismatches,
+    format_qty_mismatches, build_preview_rows, build_header_data,
+)
+from .services.prefilter import InvoicePrefilter
+from .services.validation_service import validate_required_fields, validate_preview_rows, validate_previews
+from .services.spool_service import generate_spool_line, write_spool_file, spool_filename, ConsolidatedSpoolWriter
+from .services.manifest_service import compute_input_hash, load_manifest, save_manifest, is_unchanged
+from .services.timing import timed, invoice_timing
+
+
+def get_header_values(preview):
+    return {field: str(value).strip() if value is not None else ''
+            for field, value in preview['header_data'].items()}
+
+
+def new_result(invoice_path, invoice_no=''):
+    return {'invoice_path': invoice_path, 'invoice_no': invoice_no, 'status': 'pending', 'stage': None, 'errors': []}
+
+
+class SpoolOutputSession:
+    """Output target for one generation run: per-invoice files or one consolidated file."""
+
+    def __init__(self, output_folder, consolidated=False, force=False, spool_date=None):
+        self.output_folder = output_folder
+        self.consolidated = consolidated
+        self.force = force
+        self.spool_date = spool_date
+        self.writer = None
+        self.manifest_entries = {}
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    @property
+    def consolidated_path(self):
+        return self.writer.path if self.writer else None
+
+    @property
+    def consolidated_line_count(self):
+        return self.writer.line_count if self.writer else 0
+
+    @property
+    def consolidated_lines_written(self):
+        """Lines this session added; less than consolidated_line_count when appending to the day's file."""
+        return self.writer.lines_written if self.writer else 0
+
+    def open(self):
+        os.makedirs(self.output_folder, exist_ok=True)
+        if self.consolidated:
+            self.writer = ConsolidatedSpoolWriter(self.output_folder, self.spool_date, append=not self.force)
+            self.writer.open()
+        else:
+            self.manifest_entries = load_manifest(self.output_folder)
+
+    def already_consolidated(self, invoice_no):
+        return self.writer is not None and self.writer.contains(invoice_no)
+
+    def is_unchanged(self, output_filename, input_hash):
+        if self.consolidated or self.force:
+            return False
+        return is_unchanged(self.manifest_entries, output_filename, input_hash, self.output_folder)
+
+    def write_invoice(self, invoice_no, lines, input_hash=None):
+        if self.writer:
+            self.writer.write_invoice(invoice_no, lines)
+            return self.writer.path
+
+        output_filename = spool_filename(invoice_no)
+        output_path = os.path.join(self.output_folder, output_filename)
+        write_spool_file(output_path, lines)
+        if input_hash:
+            self.manifest_entries[output_filename] = {'invoice_no': invoice_no, 'hash': input_hash}
+        return output_path
+
+    def close(self):
+        if self.writer:
+            self.writer.close()
+        elif self.manifest_entries:
+            save_manifest(self.output_folder, self.manifest_entries)
+
+
+class SpoolPipeline:
+    """GUI-independent engine: load -> extract -> validate -> match -> reconcile -> format -> write.
+
+    Works purely on plain data (paths, dicts, DataFrames). Previews carry their
+    own header_data, so formatting never reads values back from widgets.
+    """
+
+    def __init__(self, is_spare=False, dispatch_date=None, keep_text=False, validation_mode=VALIDATION_FULL,
+                 prefilter=False):
+        self.is_spare = is_spare
+        self.dispatch_date = dispatch_date
+        self.keep_text = keep_text
+        self.validation_mode = validation_mode
+        self.prefilter = prefilter
+        self.excel_path = None
+        self.excel_df = None
+        self.dispatch_index = {}
+        self.invoice_prefilter = None
+
+    def load(self, excel_path):
+        self.excel_df = load_excel_data(excel_path, self.is_spare, self.dispatch_date)
+        self.dispatch_index = index_dispatch_rows(self.excel_df)
+        self.excel_path = excel_path
+        if self.prefilter:
+            self.invoice_prefilter = InvoicePrefilter(self.dispatch_index)
+        return self.excel_df
+
+    @timed('prefilter')
+    def check_relevant(self, invoice_path):
+        """Cheap check that the workbook has rows for this PDF; see services.prefilter."""
+        return self.invoice_prefilter.check(invoice_path)
+
+    def extract(self, invoice_path):
+        return extract_invoice_data(invoice_path, keep_text=self.keep_text)
+
+    def validate(self, invoice_data, validation_info, report=None):
+        return validate_invoice_integrity(invoice_data, validation_info, self.validation_mode, report)
+
+    @timed('match')
+    def match(self, invoice_data, invoice_line_items):
+        inv_num = invoice_data.get('invoice_no', '').strip()
+        matching = find_dispatch_rows(self.excel_df, inv_num, self.is_spare, self.dispatch_index)
+        return match_invoice_rows(matching, invoice_line_items, self.is_spare)
+
+    @timed('reconcile')
+    def reconcile(self, valid_rows, invoice_line_items):
+        return find_qty_mismatches(valid_rows, invoice_line_items, self.is_spare)
+
+    def load_invoice(self, invoice_path):
+        """Run extract -> validate -> match -> reconcile for one invoice.
+
+        Returns (preview, result). preview is None when the invoice cannot be
+        generated; result['stage'] then names the stage that stopped it.
+        """
+        with invoice_timing(invoice_path):
+            return self._load_invoice(invoice_path)
+
+    def _load_invoice(self, invoice_path):
+        result = new_result(invoice_path)
+
+        if self.invoice_prefilter is not None:
+            relevant, inv_num, _ = self.check_relevant(invoice_path)
+            if not relevant:
+                result.update(invoice_no=inv_num, status='no_data', stage='prefilter',
+                              errors=[f"{os.path.basename(invoice_path)} ({inv_num})"])
+                return None, result
+
+        try:
+            invoice_data, invoice_line_items, validation_info = self.extract(invoice_path)
+        except Exception as e:
+            result.update(status='failed', stage='extract', errors=[f"Failed to read invoice: {e}"])
+            return None, result
+        result['invoice_no'] = invoice_data.get('invoice_no', '')
+
+        validation_report = {}
+        is_valid, validation_errors = self.validate(invoice_data, validation_info, validation_report)
+        if not is_valid:
+            result.update(status='failed', stage='validate', errors=validation_errors)
+            if self.validation_mode == VALIDATION_TRIAGE:
+                result['validation'] = validation_report
+            if self.keep_text:
+                result['text'] = validation_info.get('full_text', '')
+            return None, result
+
+        inv_num = invoice_data.get('invoice_no', '').strip()
+        if not inv_num:
+            result.update(status='skipped', stage='match', errors=["Invoice number not found"])
+            return None, result
+
+        if self.excel_df is None or 'INVOICE NO' not in self.excel_df.columns:
+            result.update(status='skipped', stage='match', errors=["Dispatch data has no 'INVOICE NO' column"])
+            return None, result
+
+        valid_rows = self.match(invoice_data, invoice_line_items)
+        if not valid_rows:
+            result.update(status='no_data', stage='match',
+                          errors=[f"{os.path.basename(invoice_path)} ({inv_num})"])
+            return None, result
+
+        qty_mismatches = self.reconcile(valid_rows, invoice_line_items)
+        if qty_mismatches:
+            result.update(status='failed', stage='reconcile', qty_mismatches=qty_mismatches,
+                          errors=[format_qty_mismatches(os.path.basename(invoice_path), qty_mismatches)])
+            return None, result
+
+        preview = {
+            'invoice_path': invoice_path,
+            'invoice_data': invoice_data,
+            'header_data': build_header_data(invoice_data),
+            'preview_data': build_preview_rows(valid_rows, invoice_data, invoice_line_items, self.is_spare),
+        }
+        result['status'] = 'loaded'
+        return preview, result
+
+    def prepare(self, invoice_path):
+        """load_invoice plus header and row validation, for unattended runs."""
+        with invoice_timing(invoice_path):
+            return self._prepare(invoice_path)
+
+    def _prepare(self, invoice_path):
+        preview, result = self.load_invoice(invoice_path)
+        if preview is None:
+            return None, result
+
+        is_valid, error_msg = self.validate_headers(preview)
+        if not is_valid:
+            result.update(status='failed', stage='validate_headers', errors=[error_msg])
+            return None, result
+
+        is_valid, row_errors = self.validate_rows(preview)
+        if not is_valid:
+            result.update(status='failed', stage='validate_rows', errors=row_errors)
+            return None, result
+
+        return preview, result
+
+    @timed('validate_headers')
+    def validate_headers(self, preview):
+        return validate_required_fields(get_header_values(preview), preview['invoice_data'])
+
+    @timed('validate_rows')
+    def validate_rows(self, preview):
+        return validate_preview_rows(preview['preview_data'], self.is_spare)
+
+    @timed('validate_batch')
+    def validate_batch(self, previews):
+        """validate_headers + validate_rows for every preview in one pass; see validate_previews."""
+        return validate_previews(previews, self.is_spare)
+
+    def format(self, preview):
+        header_values = get_header_values(preview)
+        invoice_data = preview['invoice_data']
+        return [generate_spool_line(row_data, header_values, invoice_data, self.is_spare)
+                for row_data in preview['preview_data']]
+
+    def write(self, preview, session, lines=None):
+        """Format and write one preview. Returns (status, line_count, output_path).
+
+        Pass `lines` when the preview has already been formatted.
+        """
+        with invoice_timing(preview.get('invoice_path')):
+            return self._write(preview, session, lines)
+
+    def _write(self, preview, session, lines=None):
+        inv_no = preview['invoice_data'].get('invoice_no', '').strip()
+        input_hash = None
+        if session.consolidated:
+            # Posting an invoice twice in the day's file would double-count it downstream.
+            if session.already_consolidated(inv_no):
+                return 'skipped', 0, session.consolidated_path
+        else:
+            output_filename = spool_filename(inv_no)
+            input_hash = compute_input_hash(preview['preview_data'], get_header_values(preview),
+                                            preview['invoice_data'], self.is_spare)
+            if session.is_unchanged(output_filename, input_hash):
+                return 'unchanged', len(preview['preview_data']), os.path.join(session.output_folder, output_filename)
+
+        if lines is None:
+            lines = self.format(preview)
+        output_path = session.write_invoice(inv_no, lines, input_hash)
+        return 'written', len(lines), output_path
+
+    def generate(self, previews, session, progress=None, cancel_event=None):
+        """Write every preview through an open session. Returns per-invoice results and counts.
+
+        When cancel_event is set, generation stops before the next invoice.
+        """
+        counts = {'written': 0, 'unchanged': 0, 'skipped': 0, 'failed': 0}
+        results = []
+        cancelled = False
+
+        for idx, preview in enumerate(previews):
+            if cancel_event is not None and cancel_event.is_set():
+                cancelled = True
+                break
+            inv_no = preview['invoice_data'].get('invoice_no', '').strip()
+            result = new_result(preview.get('invoice_path'), inv_no)
+            result['index'] = idx
+
+            if not inv_no:
+                result.update(status='failed', stage='write', errors=["no invoice number"])
+            else:
+                if progress:
+                    progress(idx + 1, len(previews), inv_no)
+                try:
+                    status, line_count, output_path = self.write(preview, session)
+                    result.update(status=status, lines=line_count, output=output_path)
+                except Exception as e:
+                    result.update(status='failed', stage='write', errors=[str(e)])
+
+            counts[result['status']] += 1
+            results.append(result)
+
+        return {'counts': counts, 'invoices': results, 'total': len(previews), 'cancelled': cancelled}
@@ -0,0 +1,425 @@
+"""Local HTTP service for spool generation with a warm workbook cache and worker pool.
+
+    python -m modular_app.server --port 8765
+
+Endpoints (JSON unless noted):
+    GET  /health                      service status
+    POST /jobs                        {"invoices": [...], "workbook": "...", "date": "DD-MM-YYYY",
+                                       "mode": "OE"|"Spare", "output": optional folder,
+                                       "inline": keep lines for /spool (default: true without "output")}
+    GET  /jobs/<id>                   job status and per-invoice results
+    GET  /jobs/<id>/spool             all spool lines of the job (text/plain)
+    GET  /jobs/<id>/spool/<name>      spool lines of one invoice, e.g. /spool/01859 (text/plain)
+
+The server only binds to loopback addresses, only accepts JSON job requests
+addressed to a loopback Host, and only reads or writes files below its --root
+folders (default: the working directory).
+"""
+import argparse
+import ipaddress
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+if __package__ is None or __package__ == "":
+    parent_dir = os.path.dirname(os.path.abspath(__file__))
+    sys.path.insert(0, os.path.dirname(parent_dir))
+    from modular_app.services.spool_service import spool_filename
+    from modular_app.pipeline import SpoolPipeline, SpoolOutputSession
+    from modular_app.cli import collect_invoice_paths, resolve_workbook
+else:
+    from .services.spool_service import spool_filename
+    from .pipeline import SpoolPipeline, SpoolOutputSession
+    from .cli import collect_invoice_paths, resolve_workbook
+
+logger = logging.getLogger('spool.server')
+
+MAX_CACHED_WORKBOOKS = 4
+MAX_FINISHED_JOBS = 200
+
+
+def is_loopback(host):
+    if host == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def host_header_name(value):
+    """Host name of a Host header value, without the port."""
+    value = (value or '').strip()
+    if value.startswith('['):
+        return value[1:].split(']', 1)[0]
+    return value.rsplit(':', 1)[0] if value.count(':') == 1 else value
+
+
+def is_within(path, roots):
+    path = os.path.realpath(path)
+    for root in roots:
+        try:
+            if os.path.commonpath([path, root]) == root:
+                return True
+        except ValueError:
+            # Different drives on Windows.
+            continue
+    return False
+
+
+class WorkbookCache:
+    """Loaded pipelines keyed by workbook path, mtime, mode and dispatch date."""
+
+    def __init__(self, max_entries=MAX_CACHED_WORKBOOKS):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._key_locks = {}
+
+    def _lookup(self, key):
+        with self._lock:
+            pipeline = self._entries.get(key)
+            if pipeline is not None:
+                self._entries.move_to_end(key)
+            return pipeline
+
+    def get(self, excel_path, is_spare, dispatch_date):
+        key = (os.path.abspath(excel_path), os.path.getmtime(excel_path), is_spare, dispatch_date.date())
+        pipeline = self._lookup(key)
+        if pipeline is not None:
+            return pipeline
+
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        # Concurrent jobs for the same workbook wait for the first load instead of repeating it.
+        with key_lock:
+            pipeline = self._lookup(key)
+            if pipeline is not None:
+                return pipeline
+
+            try:
+                pipeline = SpoolPipeline(is_spare, dispatch_date)
+                pipeline.load(excel_path)
+                with self._lock:
+                    self._entries[key] = pipeline
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+            finally:
+                with self._lock:
+                    self._key_locks.pop(key, None)
+        return pipeline
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+
+def _optional_str(request, field):
+    value = request.get(field)
+    if value is not None and not isinstance(value, str):
+        raise ValueError(f"'{field}' must be a string")
+    return value
+
+
+class SpoolService:
+    def __init__(self, workers=4, roots=None):
+        self.workers = workers
+        self.roots = [os.path.realpath(root) for root in (roots or [os.getcwd()])]
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='spool-worker')
+        self.workbooks = WorkbookCache()
+        self.jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+
+    def _check_path(self, path, field):
+        if not is_within(path, self.roots):
+            raise PermissionError(f"'{field}' is outside the service's root folders: {path}")
+
+    def submit_job(self, request):
+        """Validate a job request and queue it; returns the job id.
+
+        Raises ValueError for a malformed request and PermissionError for paths
+        outside the configured root folders.
+        """
+        invoices = request.get('invoices') or []
+        if isinstance(invoices, str):
+            invoices = [invoices]
+        if not isinstance(invoices, list) or not all(isinstance(source, str) for source in invoices):
+            raise ValueError("'invoices' must be a path or a list of paths")
+        workbook = _optional_str(request, 'workbook')
+        if not invoices or not workbook:
+            raise ValueError("'invoices' and 'workbook' are required")
+        output_folder = _optional_str(request, 'output') or None
+        inline = request.get('inline', output_folder is None)
+        if not isinstance(inline, bool):
+            raise ValueError("'inline' must be true or false")
+        if not inline and not output_folder:
+            raise ValueError("'inline' can only be false when 'output' is given")
+
+        mode = request.get('mode', 'OE')
+        if mode not in ('OE', 'Spare'):
+            raise ValueError("'mode' must be 'OE' or 'Spare'")
+        is_spare = mode == 'Spare'
+
+        date_str = _optional_str(request, 'date') or datetime.now().strftime('%d-%m-%Y')
+        try:
+            dispatch_date = datetime.strptime(date_str, '%d-%m-%Y')
+        except ValueError:
+            raise ValueError("Invalid date format. Use DD-MM-YYYY")
+
+        self._check_path(workbook, 'workbook')
+        if output_folder:
+            self._check_path(output_folder, 'output')
+        for source in invoices:
+            self._check_path(source, 'invoices')
+
+        excel_path = resolve_workbook(workbook, dispatch_date)
+        if not excel_path:
+            raise ValueError(f"No workbook found for {date_str} at {workbook}")
+        self._check_path(excel_path, 'workbook')
+
+        invoice_paths = collect_invoice_paths(invoices)
+        if not invoice_paths:
+            raise ValueError("No invoice PDFs found")
+        for path in invoice_paths:
+            self._check_path(path, 'invoices')
+
+        job_id = uuid.uuid4().hex[:12]
+        job = {
+            'job_id': job_id,
+            'status': 'queued',
+            'mode': mode,
+            'dispatch_date': date_str,
+            'workbook': excel_path,
+            'output_folder': output_folder,
+            'inline': inline,
+            'submitted': datetime.now().isoformat(timespec='seconds'),
+            'finished': None,
+            'counts': {'total': len(invoice_paths), 'written': 0, 'formatted': 0, 'unchanged': 0,
+                       'no_data': 0, 'skipped': 0, 'failed': 0},
+            'invoices': [],
+            'pending': len(invoice_paths),
+            'lines': {},
+        }
+        with self._lock:
+            self.jobs[job_id] = job
+            self._trim_jobs()
+
+        self.executor.submit(self._start_job, job, invoice_paths, excel_path, is_spare, dispatch_date)
+        return job_id
+
+    def _trim_jobs(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job['status'] in ('done', 'failed')]
+        for job_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self.jobs[job_id]
+
+    def _start_job(self, job, invoice_paths, excel_path, is_spare, dispatch_date):
+        try:
+            pipeline = self.workbooks.get(excel_path, is_spare, dispatch_date)
+        except Exception as e:
+            with self._lock:
+                job.update(status='failed', error=f"Failed to read Excel: {e}",
+                           finished=datetime.now().isoformat(timespec='seconds'))
+            return
+
+        with self._lock:
+            job['status'] = 'running'
+        for inv_path in invoice_paths:
+            self.executor.submit(self._run_invoice, job, pipeline, inv_path)
+
+    def _run_invoice(self, job, pipeline, inv_path):
+        started = time.perf_counter()
+        lines = None
+        try:
+            preview, result = pipeline.prepare(inv_path)
+            if preview is not None:
+                # Lines are held in memory only for inline jobs; written jobs are read from disk.
+                if job['inline']:
+                    lines = pipeline.format(preview)
+                    result.update(status='formatted', lines=len(lines))
+                if job['output_folder']:
+                    try:
+                        with self._write_lock:
+                            with SpoolOutputSession(job['output_folder']) as session:
+                                status, line_count, output_path = pipeline.write(preview, session, lines)
+                        result.update(status=status, lines=line_count, output=output_path)
+                    except Exception as e:
+                        lines = None
+                        result.update(status='failed', stage='write', errors=[f"Failed to write file: {e}"])
+        except Exception as e:
+            lines = None
+            result = {'invoice_path': inv_path, 'invoice_no': '', 'status': 'failed',
+                      'stage': None, 'errors': [str(e)]}
+        result['seconds'] = round(time.perf_counter() - started, 3)
+
+        with self._lock:
+            job['invoices'].append(result)
+            job['counts'][result['status']] += 1
+            if lines is not None:
+                job['lines'][spool_filename(result['invoice_no'])[:-len('.txt')]] = lines
+            job['pending'] -= 1
+            if job['pending'] == 0:
+                job['status'] = 'done'
+                job['finished'] = datetime.now().isoformat(timespec='seconds')
+
+    def get_job(self, job_id):
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return None
+            status = {key: value for key, value in job.items() if key != 'lines'}
+            status['invoices'] = list(job['invoices'])
+            status['spool'] = sorted(job['lines'])
+            return status
+
+    def get_spool(self, job_id, name=None):
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return None
+            if name is not None:
+                return job['lines'].get(name)
+            lines = []
+            for key in sorted(job['lines']):
+                lines.extend(job['lines'][key])
+            return lines
+
+    def health(self):
+        with self._lock:
+            active = sum(1 for job in self.jobs.values() if job['status'] in ('queued', 'running'))
+        return {'status': 'ok', 'workers': self.workers, 'workbooks_cached': len(self.workbooks),
+                'active_jobs': active}
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
+
+
+class SpoolRequestHandler(BaseHTTPRequestHandler):
+    server_version = 'SpoolService/1.0'
+
+    @property
+    def service(self):
+        return self.server.service
+
+    def log_message(self, format, *args):
+        logger.info("%s %s", self.address_string(), format % args)
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload, default=str).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_text(self, status, text):
+        body = text.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/plain; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        parts = [part for part in self.path.split('?', 1)[0].split('/') if part]
+
+        if parts == ['health']:
+            self._send_json(200, self.service.health())
+        elif len(parts) == 2 and parts[0] == 'jobs':
+            job = self.service.get_job(parts[1])
+            if job is None:
+                self._send_json(404, {'error': 'job not found'})
+            else:
+                self._send_json(200, job)
+        elif len(parts) in (3, 4) and parts[0] == 'jobs' and parts[2] == 'spool':
+            lines = self.service.get_spool(parts[1], parts[3] if len(parts) == 4 else None)
+            if lines is None:
+                self._send_json(404, {'error': 'spool output not found'})
+            else:
+                self._send_text(200, ''.join(line + '\n' for line in lines))
+        else:
+            self._send_json(404, {'error': 'not found'})
+
+    def do_POST(self):
+        parts = [part for part in self.path.split('?', 1)[0].split('/') if part]
+        if parts != ['jobs']:
+            self._send_json(404, {'error': 'not found'})
+            return
+
+        # A browser page can POST text/plain cross-origin without a preflight, and a
+        # rebound DNS name reaches loopback with a foreign Host; refuse both.
+        if not is_loopback(host_header_name(self.headers.get('Host'))):
+            self._send_json(403, {'error': 'Host must be a loopback address'})
+            return
+        content_type = (self.headers.get('Content-Type') or '').split(';', 1)[0].strip().lower()
+        if content_type != 'application/json':
+            self._send_json(415, {'error': 'Content-Type must be application/json'})
+            return
+
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            request = json.loads(self.rfile.read(length) or b'{}')
+            if not isinstance(request, dict):
+                raise ValueError("request body must be a JSON object")
+            job_id = self.service.submit_job(request)
+        except PermissionError as e:
+            self._send_json(403, {'error': str(e)})
+            return
+        except (TypeError, ValueError) as e:
+            self._send_json(400, {'error': str(e)})
+            return
+
+        self._send_json(202, {'job_id': job_id, 'status_url': f"/jobs/{job_id}"})
+
+
+def create_server(host='127.0.0.1', port=8765, workers=4, roots=None):
+    if not is_loopback(host):
+        raise ValueError(f"Refusing to bind to non-loopback address: {host}")
+    server = ThreadingHTTPServer((host, port), SpoolRequestHandler)
+    server.daemon_threads = True
+    server.service = SpoolService(workers, roots)
+    return server
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='spool-server', description="Local spool generation service.")
+    parser.add_argument('--host', default='127.0.0.1', help="loopback address to bind (default: 127.0.0.1)")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--workers', type=int, default=4, help="invoice worker threads")
+    parser.add_argument('--root', action='append', dest='roots', metavar='FOLDER',
+                        help="folder jobs may read invoices/workbooks from and write output to "
+                             "(repeatable; default: the working directory)")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+
+    try:
+        server = create_server(args.host, args.port, args.workers, args.roots)
+    except ValueError as e:
+        logger.error("%s", e)
+        return 2
+
+    logger.info("Spool service listening on http://%s:%d", *server.server_address[:2])
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.service.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,85 @@
+"""cProfile capture of Load Preview / Generate or a CLI batch.
+
+cProfile only sees the thread that enabled it, and the work here is spread
+over the UI thread and worker threads. CallProfiler.profile() is entered
+separately in each thread that does part of the job; the per-thread stats are
+merged, then saved as a .pstats file (for snakeviz or `python -m pstats`) and a
+text summary sorted by cumulative and by own time.
+
+Switched on with SPOOL_PROFILE=1, the CLI's --profile flag, or the hidden
+diagnostics menu in the GUI (Ctrl+Shift+P).
+"""
+import contextlib
+import cProfile
+import io
+import os
+import pstats
+import threading
+from datetime import datetime
+
+CPU_PROFILE_ENV = 'SPOOL_PROFILE'
+
+
+def cpu_profile_requested():
+    return os.environ.get(CPU_PROFILE_ENV, '').strip().lower() not in ('', '0', 'false', 'no', 'off')
+
+
+class CallProfiler:
+    def __init__(self, name, limit=40):
+        self.name = name
+        self.limit = limit
+        self.skipped = 0
+        self._stats = None
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def profile(self):
+        """Profile the block in the current thread and merge the result."""
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Another profiler already owns this thread (or, on 3.12+, the interpreter).
+            with self._lock:
+                self.skipped += 1
+            yield
+            return
+        try:
+            yield
+        finally:
+            profile.disable()
+            with self._lock:
+                if self._stats is None:
+                    self._stats = pstats.Stats(profile)
+                else:
+                    self._stats.add(profile)
+
+    def summary(self):
+        if self._stats is None:
+            return f"Profile: {self.name}\n(no samples)\n"
+        out = io.StringIO()
+        out.write(f"Profile: {self.name}\nCreated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+        if self.skipped:
+            out.write(f"Not profiled: {self.skipped} block(s) (another profiler was active)\n")
+        stats = pstats.Stats(stream=out)
+        with self._lock:
+            stats.add(self._stats)
+        stats.strip_dirs()
+        for key, title in (('cumulative', 'cumulative time'), ('tottime', 'own time')):
+            out.write(f"\n== Top {self.limit} functions by {title} ==\n")
+            stats.sort_stats(key).print_stats(self.limit)
+        return out.getvalue()
+
+    def save(self, folder):
+        """Write profile_<name>_<time>.pstats and .txt to `folder`; returns (pstats_path, text_path)."""
+        os.makedirs(folder, exist_ok=True)
+        base = os.path.join(folder, f"profile_{self.name}_{datetime.now().strftime('%Y%m%d-%H%M%S')}")
+        pstats_path = None
+        with self._lock:
+            if self._stats is not None:
+                pstats_path = base + '.pstats'
+                self._stats.dump_stats(pstats_path)
+        text_path = base + '.txt'
+        with open(text_path, 'w', encoding='utf-8') as f:
+            f.write(self.summary())
+        return pstats_path, text_path
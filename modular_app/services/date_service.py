@@ -0,0 +1,67 @@
+import re
+from datetime import datetime
+from functools import lru_cache
+
+from ..config import DATE_INPUT_FORMATS
+
+DATE_CACHE_SIZE = 4096
+
+# Shape of each supported input format. A value matching one of these can only
+# parse with that format, so it is tried first instead of walking the list.
+_FORMAT_SHAPES = {
+    '%d-%b-%y': re.compile(r'^\d{1,2}-[A-Za-z]{3}-\d{2}$'),
+    '%d-%b-%Y': re.compile(r'^\d{1,2}-[A-Za-z]{3}-\d{4}$'),
+    '%d/%m/%Y': re.compile(r'^\d{1,2}/\d{1,2}/\d{4}$'),
+    '%d-%m-%Y': re.compile(r'^\d{1,2}-\d{1,2}-\d{4}$'),
+}
+
+_CLASSIFIERS = [(_FORMAT_SHAPES[fmt], fmt) for fmt in DATE_INPUT_FORMATS if fmt in _FORMAT_SHAPES]
+
+
+def classify_date(value):
+    for pattern, fmt in _CLASSIFIERS:
+        if pattern.match(value):
+            return fmt
+    return None
+
+
+def _parse_date(value, input_formats):
+    for fmt in input_formats:
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+    return None
+
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def _normalize_cached(value, output_format):
+    dt = None
+    fmt = classify_date(value)
+    if fmt:
+        try:
+            dt = datetime.strptime(value, fmt)
+        except ValueError:
+            dt = None
+    if dt is None:
+        dt = _parse_date(value, DATE_INPUT_FORMATS)
+    if dt is None:
+        return None
+    return dt.strftime(output_format)
+
+
+def normalize_date(value, output_format, upper=False):
+    if not value or not isinstance(value, str):
+        return value
+    formatted = _normalize_cached(value, output_format)
+    if formatted is None:
+        return value
+    return formatted.upper() if upper else formatted
+
+
+def date_cache_info():
+    return _normalize_cached.cache_info()
+
+
+def clear_date_cache():
+    _normalize_cached.cache_clear()
@@ -1,11 +1,17 @@
-import pandas as pd
+import os
 from datetime import datetime
 
+from .lazy_imports import get_pandas
+from .timing import timed
 
+
+@timed('workbook_load')
 def load_excel_data(excel_path, is_spare, selected_date=None):
     if not excel_path:
         return None
 
+    pd = get_pandas()
+
     if excel_path.lower().endswith('.csv'):
         if is_spare:
             df = pd.read_csv(excel_path)
@@ -67,3 +73,35 @@ def load_excel_data(excel_path, is_spare, selected_date=None):
 
     df.columns = df.columns.str.strip().str.upper()
     return df
+
+
+def find_workbook_for_date(search_dir, selected_date):
+    date_patterns = [
+        selected_date.strftime('%d-%m-%Y'),
+        selected_date.strftime('%d-%m-%y'),
+        selected_date.strftime('%d/%m/%Y'),
+        selected_date.strftime('%Y-%m-%d'),
+    ]
+
+    for filename in os.listdir(search_dir):
+        filepath = os.path.join(search_dir, filename)
+        if os.path.isfile(filepath):
+            filename_upper = filename.upper()
+            for pattern in date_patterns:
+                if pattern.upper() in filename_upper:
+                    return filepath
+
+    month_patterns = [
+        selected_date.strftime('%b-%Y').upper(),
+        selected_date.strftime('%B-%Y').upper(),
+        selected_date.strftime('%m-%Y'),
+    ]
+    for filename in os.listdir(search_dir):
+        filepath = os.path.join(search_dir, filename)
+        if os.path.isfile(filepath) and filename.lower().endswith(('.xlsx', '.xls')):
+            filename_upper = filename.upper()
+            for pattern in month_patterns:
+                if pattern in filename_upper:
+                    return filepath
+
+    return None
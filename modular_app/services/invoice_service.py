@@ -1,40 +1,74 @@
 import os
 import re
+import sqlite3
+import threading
+import time
 
-import pdfplumber
+from ..utils import normalize_item_code
+from .lazy_imports import get_pdfplumber, get_pymupdf
+from .signature_cache import get_signature_cache, pdf_fingerprint
+from .timing import timed
+from .validation_service import GSTIN_RE
 
-try:
-    import fitz  # PyMuPDF
-    HAS_PYMUPDF = True
-except ImportError:
-    HAS_PYMUPDF = False
+ORIGINAL_COPY_PATTERNS = [
+    r'Original\s+for\s*\n?\s*Recipient',
+    r'Original\s+for\s+Recipient',
+    r'Tax\s+Invoice\s+Original',
+]
 
-from ..config import GSTIN_PATTERN
-from ..utils import normalize_item_code
+INVOICE_NO_PATTERN = r'Invoice\s+Number\s*:\s*([A-Z0-9/\-]+)'
+
+DIGITAL_SIGN_PATTERNS = [
+    r'Digitally\s+signed\s+by\s+[A-Z\s]+',
+    r'Digitally\s+signed\s+by.*Date:\d{4}\.\d{2}\.\d{2}',
+    r'Digital\s+Signature.*Date:',
+]
+
+
+def _is_original_copy(text):
+    return any(re.search(pattern, text, re.IGNORECASE) for pattern in ORIGINAL_COPY_PATTERNS)
 
 
-def extract_invoice_data(invoice_path):
+def _has_signature_text(text):
+    return any(re.search(pattern, text, re.IGNORECASE) for pattern in DIGITAL_SIGN_PATTERNS)
+
+
+@timed('extract')
+def extract_invoice_data(invoice_path, keep_text=False):
+    """Extract header fields and line items from an invoice PDF.
+
+    validation_info only carries what validate_invoice_integrity needs: the
+    text-based verdicts are computed here so the page text can be released
+    with the PDF. Pass keep_text=True to also keep it as 'full_text' for
+    debugging.
+    """
     invoice_data = {}
     invoice_line_items = {}
     validation_info = {}
 
-    with pdfplumber.open(invoice_path) as pdf:
-        full_text = ""
+    with get_pdfplumber().open(invoice_path) as pdf:
+        page_texts = []
         has_images = False
 
         for page in pdf.pages:
             page_text = page.extract_text()
             if page_text:
-                full_text += page_text + "\n"
+                page_texts.append(page_text + "\n")
 
             if page.images:
                 has_images = True
 
-        validation_info['full_text'] = full_text
+        full_text = "".join(page_texts)
+        del page_texts
+
         validation_info['has_images'] = has_images
         validation_info['pdf_path'] = invoice_path
+        validation_info['is_original'] = _is_original_copy(full_text)
+        validation_info['has_signature_text'] = _has_signature_text(full_text)
+        if keep_text:
+            validation_info['full_text'] = full_text
 
-        inv_match = re.search(r'Invoice\s+Number\s*:\s*([A-Z0-9/\-]+)', full_text, re.IGNORECASE)
+        inv_match = re.search(INVOICE_NO_PATTERN, full_text, re.IGNORECASE)
         if inv_match:
             invoice_data['invoice_no'] = inv_match.group(1).strip()
 
@@ -127,65 +161,189 @@ def get_invoice_item(part_number, invoice_line_items):
     return None
 
 
-def validate_invoice_integrity(invoice_data, validation_info):
-    errors = []
-    full_text = validation_info.get('full_text', '')
-    pdf_path = validation_info.get('pdf_path', '')
+VALIDATION_FULL = 'full'
+VALIDATION_TRIAGE = 'triage'
+
 
+def _irn_error(invoice_data, validation_info):
     irn = invoice_data.get('irn_number', '')
     if not irn:
-        errors.append("IRN Number not found in invoice")
-    elif len(irn) != 64:
-        errors.append(f"IRN Number invalid length: {len(irn)} chars (expected 64)")
-    elif not re.match(r'^[a-f0-9]{64}$', irn, re.IGNORECASE):
-        errors.append("IRN Number contains invalid characters (must be alphanumeric hex)")
-
-    original_patterns = [
-        r'Original\s+for\s*\n?\s*Recipient',
-        r'Original\s+for\s+Recipient',
-        r'Tax\s+Invoice\s+Original',
-    ]
-    is_original = any(re.search(pattern, full_text, re.IGNORECASE) for pattern in original_patterns)
+        return "IRN Number not found in invoice"
+    if len(irn) != 64:
+        return f"IRN Number invalid length: {len(irn)} chars (expected 64)"
+    if not re.match(r'^[a-f0-9]{64}$', irn, re.IGNORECASE):
+        return "IRN Number contains invalid characters (must be alphanumeric hex)"
+    return None
+
+
+def _original_error(invoice_data, validation_info):
+    is_original = validation_info.get('is_original')
+    if is_original is None:
+        is_original = _is_original_copy(validation_info.get('full_text', ''))
     if not is_original:
-        errors.append("Invoice is not 'Original for Recipient' copy")
+        return "Invoice is not 'Original for Recipient' copy"
+    return None
+
+
+def _signature_in_text(validation_info):
+    has_signature_text = validation_info.get('has_signature_text')
+    if has_signature_text is None:
+        has_signature_text = _has_signature_text(validation_info.get('full_text', ''))
+    return has_signature_text
 
-    has_digital_signature = _check_digital_signature(pdf_path, full_text)
-    if not has_digital_signature:
-        errors.append("Digital Signature not found (must have 'Digitally signed by...' with signer name)")
 
+def _signature_error(invoice_data, validation_info):
+    if _signature_in_text(validation_info) or verify_signature(validation_info.get('pdf_path', ''))[0]:
+        return None
+    return "Digital Signature not found (must have 'Digitally signed by...' with signer name)"
+
+
+def _gstin_error(invoice_data, validation_info):
     gst_no = invoice_data.get('gst_no', '')
     if not gst_no:
-        errors.append("GSTIN Number not found in invoice")
-    else:
-        if not re.match(GSTIN_PATTERN, gst_no, re.IGNORECASE):
-            errors.append(f"GSTIN Number format invalid: {gst_no}")
-        else:
-            state_code = int(gst_no[:2])
-            if state_code < 1 or state_code > 37:
-                errors.append(f"GSTIN state code invalid: {state_code} (must be 01-37)")
+        return "GSTIN Number not found in invoice"
+    if not GSTIN_RE.match(gst_no):
+        return f"GSTIN Number format invalid: {gst_no}"
+    state_code = int(gst_no[:2])
+    if state_code < 1 or state_code > 37:
+        return f"GSTIN state code invalid: {state_code} (must be 01-37)"
+    return None
+
 
+INTEGRITY_CHECKS = {
+    'irn': _irn_error,
+    'original': _original_error,
+    'signature': _signature_error,
+    'gstin': _gstin_error,
+}
+# Full mode reports every problem in the order the GUI has always listed them;
+# triage runs the cheapest checks first and stops at the first failure.
+FULL_CHECK_ORDER = ('irn', 'original', 'signature', 'gstin')
+TRIAGE_CHECK_ORDER = ('irn', 'gstin', 'original', 'signature')
+
+
+class _CheckCosts:
+    """Running average cost of each integrity check in this process, for estimating skipped work."""
+
+    def __init__(self):
+        self._totals = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(name, validation_info):
+        # The signature check is only expensive when the page text has no signature and the PDF is reopened.
+        if name == 'signature':
+            return 'signature' if not _signature_in_text(validation_info) else None
+        return name
+
+    def add(self, name, validation_info, seconds):
+        key = self._key(name, validation_info)
+        if key is None:
+            return
+        with self._lock:
+            totals = self._totals.setdefault(key, [0.0, 0])
+            totals[0] += seconds
+            totals[1] += 1
+
+    def estimate(self, name, validation_info):
+        key = self._key(name, validation_info)
+        with self._lock:
+            seconds, count = self._totals.get(key, (0.0, 0))
+        return seconds / count if count else 0.0
+
+
+_check_costs = _CheckCosts()
+
+
+@timed('validate')
+def validate_invoice_integrity(invoice_data, validation_info, mode=VALIDATION_FULL, report=None):
+    """Check IRN, 'Original for Recipient', digital signature and GSTIN.
+
+    mode=VALIDATION_TRIAGE orders the checks by cost and stops at the first
+    failure. When `report` is a dict it receives the checks run and skipped
+    and 'seconds_saved': the average cost so far of the skipped checks (0 for
+    a check that has not run yet in this process).
+    """
+    triage = mode == VALIDATION_TRIAGE
+    order = TRIAGE_CHECK_ORDER if triage else FULL_CHECK_ORDER
+    errors = []
+    checks_run = []
+    for name in order:
+        started = time.perf_counter()
+        error = INTEGRITY_CHECKS[name](invoice_data, validation_info)
+        _check_costs.add(name, validation_info, time.perf_counter() - started)
+        checks_run.append(name)
+        if error:
+            errors.append(error)
+            if triage:
+                break
+
+    if report is not None:
+        skipped = list(order[len(checks_run):])
+        seconds_saved = sum((_check_costs.estimate(name, validation_info) for name in skipped), 0.0)
+        report.update(mode=mode, checks_run=checks_run, checks_skipped=skipped, seconds_saved=round(seconds_saved, 6))
     return len(errors) == 0, errors
 
 
-def _check_digital_signature(pdf_path, pdfplumber_text):
-    digital_sign_patterns = [
-        r'Digitally\s+signed\s+by\s+[A-Z\s]+',
-        r'Digitally\s+signed\s+by.*Date:\d{4}\.\d{2}\.\d{2}',
-        r'Digital\s+Signature.*Date:',
-    ]
-    for pattern in digital_sign_patterns:
-        if re.search(pattern, pdfplumber_text, re.IGNORECASE):
-            return True
+@timed('signature')
+def verify_signature(pdf_path):
+    """PDF-level signature check through the persistent verdict cache. Returns (signed, signer)."""
+    cache = get_signature_cache()
+    fingerprint = None
+    if cache is not None and pdf_path and os.path.exists(pdf_path):
+        try:
+            fingerprint = pdf_fingerprint(pdf_path)
+            cached = cache.get(fingerprint)
+        except (OSError, sqlite3.Error):
+            fingerprint = cached = None
+        if cached is not None:
+            return cached
+
+    signed, signer, complete = _find_signature(pdf_path)
+    # "Unsigned" from a check that failed or lacked PyMuPDF may be wrong; only keep it if every check ran.
+    if fingerprint is not None and (signed or complete):
+        try:
+            cache.put(fingerprint, signed, signer, pdf_path)
+        except sqlite3.Error:
+            pass
+    return signed, signer
 
-    if HAS_PYMUPDF and pdf_path and os.path.exists(pdf_path):
+
+def _widget_signer(doc, widget):
+    try:
+        kind, value = doc.xref_get_key(widget.xref, 'V')
+        if kind == 'xref':
+            kind, name = doc.xref_get_key(int(value.split()[0]), 'Name')
+            if kind == 'string':
+                return name
+    except Exception:
+        pass
+    return ''
+
+
+def _text_signer(text):
+    match = re.search(r'Digitally\s+signed\s+by\s+([A-Z][A-Z .]*[A-Z])', text)
+    return match.group(1) if match else ''
+
+
+def _find_signature(pdf_path):
+    """Look for a signature field or signature text in the PDF itself.
+
+    Returns (signed, signer name or '', complete); complete is False when
+    PyMuPDF is missing or a check raised, so a negative verdict is not final.
+    """
+    fitz = get_pymupdf()
+    complete = fitz is not None
+    if fitz is not None and pdf_path and os.path.exists(pdf_path):
         try:
             doc = fitz.open(pdf_path)
             for page in doc:
                 widgets = list(page.widgets())
                 for widget in widgets:
                     if widget.field_type_string == 'Signature':
+                        signer = _widget_signer(doc, widget)
                         doc.close()
-                        return True
+                        return True, signer, True
 
                 text_dict = page.get_text("dict")
                 all_text = []
@@ -196,16 +354,16 @@ def _check_digital_signature(pdf_path, pdfplumber_text):
                                 all_text.append(span.get("text", ""))
 
                 page_text = " ".join(all_text)
-                if any(re.search(pattern, page_text, re.IGNORECASE) for pattern in digital_sign_patterns):
+                if _has_signature_text(page_text):
                     doc.close()
-                    return True
+                    return True, _text_signer(page_text), True
             doc.close()
         except Exception:
-            pass
+            complete = False
 
     if pdf_path and os.path.exists(pdf_path):
         try:
-            with pdfplumber.open(pdf_path) as pdf:
+            with get_pdfplumber().open(pdf_path) as pdf:
                 for page in pdf.pages:
                     annots = page.annots
                     if annots:
@@ -218,8 +376,8 @@ def _check_digital_signature(pdf_path, pdfplumber_text):
                                     if isinstance(signer_name, bytes):
                                         signer_name = signer_name.decode('utf-8', errors='ignore')
                                     if signer_name:
-                                        return True
+                                        return True, signer_name, True
         except Exception:
-            pass
+            complete = False
 
-    return False
+    return False, '', complete
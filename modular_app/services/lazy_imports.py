@@ -0,0 +1,51 @@
+"""Deferred loading of the heavy spreadsheet and PDF libraries.
+
+pandas, pdfplumber and PyMuPDF take seconds to import in a frozen build.
+The services fetch them through these getters on first use instead of at
+module load, so the window can appear before they are needed. start_warm_up()
+imports them on a background thread once the UI is up.
+"""
+import functools
+import threading
+
+
+@functools.lru_cache(maxsize=None)
+def get_pandas():
+    import pandas
+    return pandas
+
+
+@functools.lru_cache(maxsize=None)
+def get_pdfplumber():
+    import pdfplumber
+    return pdfplumber
+
+
+@functools.lru_cache(maxsize=None)
+def get_pymupdf():
+    """Return the PyMuPDF module, or None when it is not installed."""
+    try:
+        import pymupdf  # PyMuPDF >= 1.24.3; `import fitz` prints a deprecation notice to stdout
+        return pymupdf
+    except ImportError:
+        pass
+    try:
+        import fitz  # PyMuPDF
+        return fitz
+    except ImportError:
+        return None
+
+
+def warm_up():
+    for loader in (get_pandas, get_pdfplumber, get_pymupdf):
+        try:
+            loader()
+        except Exception:
+            # A broken optional install surfaces again on first real use.
+            pass
+
+
+def start_warm_up():
+    thread = threading.Thread(target=warm_up, name='import-warm-up', daemon=True)
+    thread.start()
+    return thread
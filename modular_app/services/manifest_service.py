@@ -0,0 +1,51 @@
+import hashlib
+import json
+import os
+
+MANIFEST_FILENAME = '.spool_manifest.json'
+MANIFEST_VERSION = 2
+
+# The inputs generate_spool_line reads. Other preview fields (e.g. unload_no,
+# derived from the current date) must not change the hash.
+SPOOL_HEADER_FIELDS = ('vendor_code', 'challan_no', 'challan_date', 'invoice_no', 'invoice_date', 'po_number')
+SPOOL_ROW_FIELDS = ('schedule_no', 'item_code', 'qty', 'bin_qty', 'batch_no', 'gst_no', 'hsn_code',
+                    'cgst_amt', 'sgst_amt', 'eway_bill', 'igst_amt', 'basic_price', 'total_value')
+
+
+def compute_input_hash(preview_data, header_values, invoice_data, is_spare):
+    payload = {
+        'version': MANIFEST_VERSION,
+        'rows': [[row.get(field) for field in SPOOL_ROW_FIELDS] for row in preview_data],
+        'header': [header_values.get(field) for field in SPOOL_HEADER_FIELDS],
+        'irn_number': invoice_data.get('irn_number', ''),
+        'is_spare': bool(is_spare),
+    }
+    encoded = json.dumps(payload, sort_keys=True, default=str).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def load_manifest(output_folder):
+    manifest_path = os.path.join(output_folder, MANIFEST_FILENAME)
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(manifest, dict) or manifest.get('version') != MANIFEST_VERSION:
+        return {}
+    return manifest.get('invoices', {})
+
+
+def save_manifest(output_folder, entries):
+    manifest_path = os.path.join(output_folder, MANIFEST_FILENAME)
+    tmp_path = manifest_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'version': MANIFEST_VERSION, 'invoices': entries}, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, manifest_path)
+
+
+def is_unchanged(entries, output_filename, input_hash, output_folder):
+    entry = entries.get(output_filename)
+    if not entry or entry.get('hash') != input_hash:
+        return False
+    return os.path.exists(os.path.join(output_folder, output_filename))
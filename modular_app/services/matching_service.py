@@ -0,0 +1,160 @@
+from datetime import datetime
+
+from ..models import PreviewRow
+from .invoice_service import get_invoice_item
+from .lazy_imports import get_pandas
+
+
+def get_dispatch_columns(is_spare):
+    return {
+        'part': 'PART NUMBER',
+        'schedule': 'DI NUMBER' if is_spare else 'KANBAN NO',
+        'qty': 'SCHEDULED QUANTITY' if is_spare else 'QTY REQ',
+        'packing': 'PACKING STANDERD',
+        'batch': 'LATEST BATCH CODE' if is_spare else None,
+    }
+
+
+def index_dispatch_rows(excel_df):
+    if excel_df is None or 'INVOICE NO' not in excel_df.columns:
+        return {}
+    keys = excel_df['INVOICE NO'].astype(str).str.strip()
+    return {inv_num: group for inv_num, group in excel_df.groupby(keys, sort=False)}
+
+
+def find_dispatch_rows(excel_df, inv_num, is_spare, dispatch_index=None):
+    if dispatch_index is not None:
+        matching = dispatch_index.get(inv_num, excel_df.iloc[0:0])
+    else:
+        matching = excel_df[excel_df['INVOICE NO'].astype(str).str.strip() == inv_num]
+
+    schedule_col = get_dispatch_columns(is_spare)['schedule']
+    if schedule_col in matching.columns:
+        matching = matching[matching[schedule_col].notna()]
+    return matching
+
+
+def match_invoice_rows(matching, invoice_line_items, is_spare):
+    pd = get_pandas()
+    part_col = get_dispatch_columns(is_spare)['part']
+    valid_rows = []
+    for _, row in matching.iterrows():
+        part_number = str(row.get(part_col, '')) if pd.notna(row.get(part_col)) else ''
+        if get_invoice_item(part_number, invoice_line_items):
+            valid_rows.append(row)
+    return valid_rows
+
+
+def find_qty_mismatches(valid_rows, invoice_line_items, is_spare):
+    pd = get_pandas()
+    columns = get_dispatch_columns(is_spare)
+    part_col = columns['part']
+    qty_col = columns['qty']
+
+    excel_qty_by_part = {}
+    for row in valid_rows:
+        part_number = str(row.get(part_col, '')) if pd.notna(row.get(part_col)) else ''
+        if not part_number:
+            continue
+
+        excel_qty_val = row.get(qty_col, 0)
+        try:
+            excel_qty = int(float(excel_qty_val)) if pd.notna(excel_qty_val) and excel_qty_val else 0
+        except (ValueError, TypeError):
+            excel_qty = 0
+
+        if part_number in excel_qty_by_part:
+            excel_qty_by_part[part_number] += excel_qty
+        else:
+            excel_qty_by_part[part_number] = excel_qty
+
+    qty_mismatches = []
+    for part_number, total_excel_qty in excel_qty_by_part.items():
+        invoice_item = get_invoice_item(part_number, invoice_line_items)
+        if invoice_item:
+            invoice_qty_str = invoice_item.get('qty', '0')
+            try:
+                invoice_qty = int(float(invoice_qty_str)) if invoice_qty_str else 0
+            except (ValueError, TypeError):
+                invoice_qty = 0
+
+            if invoice_qty != total_excel_qty:
+                qty_mismatches.append({
+                    'part': part_number,
+                    'invoice_qty': invoice_qty,
+                    'excel_qty': total_excel_qty
+                })
+    return qty_mismatches
+
+
+def format_qty_mismatches(inv_name, qty_mismatches):
+    error_lines = [f"Invoice: {inv_name}", "", "Quantity Mismatches Found:", ""]
+    for mismatch in qty_mismatches:
+        error_lines.append(f"Part: {mismatch['part']}")
+        error_lines.append(f"  Invoice Qty: {mismatch['invoice_qty']}")
+        error_lines.append(f"  Nagare Qty: {mismatch['excel_qty']}")
+        error_lines.append("")
+    return "\n".join(error_lines)
+
+
+def build_preview_rows(valid_rows, invoice_data, invoice_line_items, is_spare):
+    pd = get_pandas()
+    columns = get_dispatch_columns(is_spare)
+    part_col = columns['part']
+    schedule_col = columns['schedule']
+    qty_col = columns['qty']
+    packing_col = columns['packing']
+    batch_col = columns['batch']
+
+    preview_data = []
+    for idx, row in enumerate(valid_rows):
+        part_number = str(row.get(part_col, ''))
+        invoice_item = get_invoice_item(part_number, invoice_line_items)
+
+        unload_no = f"{datetime.now().strftime('%Y%m%d')}{idx+1:02d}"
+        schedule_no = str(row.get(schedule_col, '')) if pd.notna(row.get(schedule_col)) else ''
+        qty_val = row.get(qty_col, 0)
+        qty = str(int(float(qty_val))) if pd.notna(qty_val) and qty_val else ''
+        pack_val = row.get(packing_col, 0)
+        bin_qty = str(int(float(pack_val))) if pd.notna(pack_val) and pack_val else ''
+        batch_no = ''
+        if is_spare and batch_col and batch_col in row.index:
+            batch_val = row.get(batch_col, '')
+            batch_no = str(batch_val) if pd.notna(batch_val) else ''
+
+        row_data = PreviewRow(
+            unload_no=unload_no,
+            schedule_no=schedule_no,
+            item_code=part_number,
+            qty=qty,
+            po_number=invoice_data.get('po_number', ''),
+            f57_2no='',
+            bin_qty=bin_qty,
+            remarks='',
+            batch_no=batch_no,
+            location='',
+            gst_no=invoice_data.get('gst_no', ''),
+            hsn_code=invoice_item.get('hsn_code', '') if invoice_item else '',
+            cgst_amt=invoice_data.get('cgst_amt', ''),
+            sgst_amt=invoice_data.get('sgst_amt', ''),
+            igst_amt=invoice_data.get('igst_amt', ''),
+            eway_bill=invoice_data.get('eway_bill', '0'),
+            basic_price=invoice_item.get('rate', '') if invoice_item else '',
+            total_value=invoice_data.get('total_value', ''),
+            tool_amort='0',
+        )
+        preview_data.append(row_data)
+    return preview_data
+
+
+def build_header_data(invoice_data):
+    return {
+        'invoice_no': invoice_data.get('invoice_no', ''),
+        'invoice_date': invoice_data.get('invoice_date', ''),
+        'vendor_code': invoice_data.get('vendor_code', ''),
+        'po_number': invoice_data.get('po_number', ''),
+        'gst_no': invoice_data.get('gst_no', ''),
+        'challan_no': invoice_data.get('invoice_no', ''),
+        'challan_date': invoice_data.get('invoice_date', ''),
+    }
+
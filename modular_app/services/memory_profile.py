@@ -0,0 +1,169 @@
+"""tracemalloc + RSS checkpoints for finding what holds memory during a batch.
+
+Set SPOOL_MEMORY_PROFILE=1 before starting the app. Load Preview and Generate
+then take a snapshot at each stage boundary and write a report to
+SpoolOutput/Profiles: one summary line per stage (RSS, traced memory, peak
+within the stage) followed by the source lines that allocated the most during
+that stage. Allocations are attributed to the line that made them, so
+pdfplumber, pandas and our own services show up under their own file paths.
+
+Tracing slows Python allocations down noticeably; keep it off for normal runs.
+"""
+import linecache
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+try:
+    import psutil
+    HAS_PSUTIL = True
+except ImportError:
+    HAS_PSUTIL = False
+
+MEMORY_PROFILE_ENV = 'SPOOL_MEMORY_PROFILE'
+
+_SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, linecache.__file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+    tracemalloc.Filter(False, '<unknown>'),
+)
+
+
+def memory_profile_requested():
+    return os.environ.get(MEMORY_PROFILE_ENV, '').strip().lower() not in ('', '0', 'false', 'no', 'off')
+
+
+def current_rss():
+    """Resident set size of this process in bytes, or None when it cannot be read."""
+    if HAS_PSUTIL:
+        return psutil.Process().memory_info().rss
+    if sys.platform == 'win32':
+        return _windows_rss()
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _windows_rss():
+    import ctypes
+    from ctypes import wintypes
+
+    class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+        _fields_ = [('cb', wintypes.DWORD), ('PageFaultCount', wintypes.DWORD),
+                    ('PeakWorkingSetSize', ctypes.c_size_t), ('WorkingSetSize', ctypes.c_size_t),
+                    ('QuotaPeakPagedPoolUsage', ctypes.c_size_t), ('QuotaPagedPoolUsage', ctypes.c_size_t),
+                    ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t), ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+                    ('PagefileUsage', ctypes.c_size_t), ('PeakPagefileUsage', ctypes.c_size_t)]
+
+    counters = PROCESS_MEMORY_COUNTERS()
+    counters.cb = ctypes.sizeof(counters)
+    process = ctypes.windll.kernel32.GetCurrentProcess()
+    if not ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+        return None
+    return counters.WorkingSetSize
+
+
+def format_bytes(size):
+    if size is None:
+        return 'n/a'
+    sign = '-' if size < 0 else ''
+    size = abs(size)
+    for unit in ('B', 'KiB', 'MiB'):
+        if size < 1024:
+            return f"{sign}{size:.0f} {unit}" if unit == 'B' else f"{sign}{size:.1f} {unit}"
+        size /= 1024
+    return f"{sign}{size:.2f} GiB"
+
+
+class MemoryProfiler:
+    """Snapshots memory at named checkpoints; each checkpoint closes the stage since the previous one.
+
+    Only the latest snapshot is kept; the per-stage allocator lines are
+    formatted at the checkpoint so the profiler itself stays small.
+    """
+
+    def __init__(self, name, top=15, frames=1):
+        self.name = name
+        self.top = top
+        self.frames = frames
+        self.stages = []
+        self._snapshot = None
+        self._started_tracing = False
+        self._started = None
+        self._stage_started = None
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            self._started_tracing = True
+        self._started = self._stage_started = time.perf_counter()
+        self._snapshot = self._take_snapshot()
+        self.stages.append({'stage': 'start', 'seconds': 0.0, 'rss': current_rss(),
+                            'traced': tracemalloc.get_traced_memory()[0], 'peak': None, 'top': []})
+        return self
+
+    def checkpoint(self, stage):
+        """Record the end of `stage`: RSS, traced memory, peak since the last checkpoint and top allocators."""
+        if self._snapshot is None:
+            return
+        traced, peak = tracemalloc.get_traced_memory()
+        snapshot = self._take_snapshot()
+        top = snapshot.compare_to(self._snapshot, 'lineno')[:self.top]
+        now = time.perf_counter()
+        self.stages.append({
+            'stage': stage,
+            'seconds': now - self._stage_started,
+            'rss': current_rss(),
+            'traced': traced,
+            'peak': peak,
+            'top': [(str(stat.traceback), stat.size_diff, stat.size, stat.count_diff) for stat in top],
+        })
+        self._snapshot = snapshot
+        self._stage_started = now
+        if hasattr(tracemalloc, 'reset_peak'):
+            tracemalloc.reset_peak()
+
+    def stop(self):
+        self._snapshot = None
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def _take_snapshot(self):
+        return tracemalloc.take_snapshot().filter_traces(_SNAPSHOT_FILTERS)
+
+    def report(self):
+        lines = [f"Memory profile: {self.name}",
+                 f"Created: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
+                 f"Elapsed: {time.perf_counter() - self._started:.2f}s" if self._started else "Elapsed: n/a",
+                 '',
+                 f"{'stage':<18}{'seconds':>9}{'rss':>13}{'rss delta':>13}{'traced':>13}{'stage peak':>13}"]
+        previous_rss = None
+        for entry in self.stages:
+            rss_delta = entry['rss'] - previous_rss if entry['rss'] is not None and previous_rss is not None else None
+            lines.append(f"{entry['stage']:<18}{entry['seconds']:>9.2f}{format_bytes(entry['rss']):>13}"
+                         f"{format_bytes(rss_delta):>13}{format_bytes(entry['traced']):>13}"
+                         f"{format_bytes(entry['peak']):>13}")
+            previous_rss = entry['rss']
+
+        for entry in self.stages[1:]:
+            lines += ['', f"== {entry['stage']}: top {self.top} allocators by growth =="]
+            if not entry['top']:
+                lines.append('  (no allocations)')
+            for location, size_diff, size, count_diff in entry['top']:
+                lines.append(f"  {format_bytes(size_diff):>12}  (now {format_bytes(size)}, {count_diff:+d} blocks)  "
+                             f"{location}")
+        return '\n'.join(lines) + '\n'
+
+    def save(self, folder):
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, f"memory_{self.name}_{datetime.now().strftime('%Y%m%d-%H%M%S')}.txt")
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(self.report())
+        return path
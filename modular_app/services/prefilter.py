@@ -0,0 +1,71 @@
+"""Cheap relevance check of invoice PDFs against the loaded dispatch data.
+
+Fully parsing and validating a PDF costs hundreds of milliseconds, which is
+wasted on invoices the workbook has no rows for. Before that, the invoice
+number is derived cheaply:
+
+1. From the file name: the last run of digits is the invoice serial, so
+   '1859.pdf' stands for 'G/I/25-26/01859'. A serial the workbook knows keeps
+   the PDF without opening it.
+2. Otherwise from the first page's header text only. A PDF is skipped only
+   when this header names an invoice number the workbook has no rows for.
+
+A PDF whose number cannot be determined either way is kept, so the full
+parse still decides.
+
+Opt-in: the CLI's --prefilter flag, or SPOOL_PREFILTER=1 for the CLI and GUI.
+"""
+import os
+import re
+
+from .invoice_service import INVOICE_NO_PATTERN
+from .lazy_imports import get_pdfplumber, get_pymupdf
+
+PREFILTER_ENV = 'SPOOL_PREFILTER'
+
+LAST_DIGITS_RE = re.compile(r'(\d+)\D*$')
+INVOICE_NO_RE = re.compile(INVOICE_NO_PATTERN, re.IGNORECASE)
+
+
+def prefilter_requested():
+    return os.environ.get(PREFILTER_ENV, '').strip().lower() not in ('', '0', 'false', 'no', 'off')
+
+
+def invoice_serial(value):
+    """Numeric serial of an invoice number or file name: its last run of digits."""
+    match = LAST_DIGITS_RE.search(value or '')
+    return int(match.group(1)) if match else None
+
+
+def read_header_invoice_no(pdf_path):
+    """Invoice number from the first page's text, or None when it cannot be read."""
+    try:
+        fitz = get_pymupdf()
+        if fitz is not None:
+            with fitz.open(pdf_path) as doc:
+                # sort=True keeps each label on the same line as its value.
+                text = doc[0].get_text(sort=True) if doc.page_count else ''
+        else:
+            with get_pdfplumber().open(pdf_path) as pdf:
+                text = (pdf.pages[0].extract_text() or '') if pdf.pages else ''
+    except Exception:
+        return None
+    match = INVOICE_NO_RE.search(text)
+    return match.group(1).strip() if match else None
+
+
+class InvoicePrefilter:
+    def __init__(self, invoice_numbers):
+        self.invoice_numbers = {str(number).strip() for number in invoice_numbers}
+        self.serials = {invoice_serial(number) for number in self.invoice_numbers} - {None}
+
+    def check(self, pdf_path):
+        """Return (keep, invoice_no, source); invoice_no is None unless read from the header."""
+        stem = os.path.splitext(os.path.basename(pdf_path))[0]
+        if invoice_serial(stem) in self.serials:
+            return True, None, 'filename'
+
+        invoice_no = read_header_invoice_no(pdf_path)
+        if invoice_no is None:
+            return True, None, 'unknown'
+        return invoice_no in self.invoice_numbers, invoice_no, 'header'
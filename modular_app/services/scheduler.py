@@ -0,0 +1,114 @@
+import asyncio
+import functools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+EVENT_QUEUED = 'queued'
+EVENT_STARTED = 'started'
+EVENT_DONE = 'done'
+EVENT_FAILED = 'failed'
+EVENT_CANCELLED = 'cancelled'
+
+
+class JobScheduler:
+    """Runs per-invoice tasks with a concurrency limit, per-task timeouts and cancellation.
+
+    Tasks are (task_id, func, *args) tuples. Plain functions run on a thread
+    pool; coroutine functions are awaited directly. Every state change is
+    published to subscribers as a dict:
+
+        {'event': 'queued'|'started'|'done'|'failed'|'cancelled',
+         'task_id': ..., 'timestamp': <epoch seconds>, 'index': n, 'total': n,
+         'wait': <seconds queued>, 'duration': <seconds running>,
+         'result': ..., 'error': ...}
+
+    Cancellation is cooperative: tasks that have not started are skipped,
+    tasks already running on a thread finish their current invoice. A timed
+    out thread task is reported as failed but its thread cannot be killed
+    and runs to completion in the background.
+    """
+
+    def __init__(self, concurrency=4, timeout=None):
+        self.concurrency = max(1, concurrency)
+        self.timeout = timeout
+        self._subscribers = []
+        self._cancel_event = threading.Event()
+
+    def subscribe(self, callback):
+        self._subscribers.append(callback)
+        return callback
+
+    def unsubscribe(self, callback):
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+
+    def cancel(self):
+        self._cancel_event.set()
+
+    @property
+    def cancelled(self):
+        return self._cancel_event.is_set()
+
+    def _emit(self, event, task_id, **fields):
+        record = {'event': event, 'task_id': task_id, 'timestamp': time.time()}
+        record.update(fields)
+        for callback in list(self._subscribers):
+            callback(record)
+
+    async def run(self, tasks):
+        """Run all tasks and return their outcomes in input order."""
+        tasks = list(tasks)
+        total = len(tasks)
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='spool-job')
+
+        queued_at = time.perf_counter()
+        for index, (task_id, *_) in enumerate(tasks):
+            self._emit(EVENT_QUEUED, task_id, index=index, total=total)
+
+        async def run_one(index, task_id, func, args):
+            async with semaphore:
+                wait = time.perf_counter() - queued_at
+                if self.cancelled:
+                    self._emit(EVENT_CANCELLED, task_id, index=index, total=total, wait=wait)
+                    return {'task_id': task_id, 'status': EVENT_CANCELLED, 'result': None, 'error': None}
+
+                self._emit(EVENT_STARTED, task_id, index=index, total=total, wait=wait)
+                started = time.perf_counter()
+                if asyncio.iscoroutinefunction(func):
+                    awaitable = func(*args)
+                else:
+                    awaitable = loop.run_in_executor(executor, functools.partial(func, *args))
+
+                try:
+                    if self.timeout:
+                        result = await asyncio.wait_for(awaitable, self.timeout)
+                    else:
+                        result = await awaitable
+                except asyncio.TimeoutError:
+                    error = f"timed out after {self.timeout:g}s"
+                except asyncio.CancelledError:
+                    self._emit(EVENT_CANCELLED, task_id, index=index, total=total, wait=wait,
+                               duration=time.perf_counter() - started)
+                    raise
+                except Exception as e:
+                    error = str(e) or e.__class__.__name__
+                else:
+                    self._emit(EVENT_DONE, task_id, index=index, total=total, wait=wait,
+                               duration=time.perf_counter() - started, result=result)
+                    return {'task_id': task_id, 'status': EVENT_DONE, 'result': result, 'error': None}
+
+                self._emit(EVENT_FAILED, task_id, index=index, total=total, wait=wait,
+                           duration=time.perf_counter() - started, error=error)
+                return {'task_id': task_id, 'status': EVENT_FAILED, 'result': None, 'error': error}
+
+        try:
+            return await asyncio.gather(*(run_one(index, task_id, func, args)
+                                          for index, (task_id, func, *args) in enumerate(tasks)))
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def run_sync(self, tasks):
+        return asyncio.run(self.run(tasks))
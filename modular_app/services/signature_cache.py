@@ -0,0 +1,127 @@
+"""Persistent cache of PDF digital-signature verdicts.
+
+An issued, signed invoice never changes, so the result of the PDF-level
+signature check (and the signer name) is stored in a small SQLite database
+and reused when the same file is validated again.
+
+The key is a cheap fingerprint: file size, mtime and a SHA-256 of the
+/ByteRange declaration plus the signature bytes it points at (the /Contents
+gap). A PDF without /ByteRange is keyed by the hash of its last 64 KiB.
+
+The database lives in the user's local app-data folder by default. Set
+SPOOL_SIGNATURE_CACHE to another file path, or to 'off' to disable it.
+"""
+import functools
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+from datetime import datetime
+
+SIGNATURE_CACHE_ENV = 'SPOOL_SIGNATURE_CACHE'
+TAIL_BYTES = 64 * 1024
+CHUNK_BYTES = 1024 * 1024
+
+BYTE_RANGE_RE = re.compile(rb'/ByteRange\s*\[\s*(\d+)\s+(\d+)\s+(\d+)\s+(\d+)\s*\]')
+
+
+def default_cache_path():
+    base_dir = os.environ.get('LOCALAPPDATA') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base_dir, 'SpoolFileGenerator', 'signature_cache.sqlite3')
+
+
+def _find_byte_ranges(f, size):
+    """/ByteRange matches anywhere in the file, read in overlapping chunks rather than all at once."""
+    matches = []
+    overlap = 128  # longer than any /ByteRange declaration
+    offset = 0
+    carry = b''
+    while offset < size:
+        f.seek(offset)
+        chunk = f.read(CHUNK_BYTES)
+        if not chunk:
+            break
+        data = carry + chunk
+        limit = len(data) if offset + len(chunk) >= size else len(data) - overlap
+        for match in BYTE_RANGE_RE.finditer(data):
+            # A match starting in the overlap is found again, whole, in the next chunk.
+            if match.start() < limit:
+                matches.append(match)
+        carry = data[limit:] if limit < len(data) else b''
+        offset += len(chunk)
+    return matches
+
+
+def pdf_fingerprint(pdf_path):
+    """'size:mtime_ns:sha256' of the PDF's signature region; raises OSError if the file cannot be read."""
+    stat = os.stat(pdf_path)
+    digest = hashlib.sha256()
+    with open(pdf_path, 'rb') as f:
+        f.seek(max(0, stat.st_size - TAIL_BYTES))
+        tail = f.read()
+        byte_ranges = list(BYTE_RANGE_RE.finditer(tail))
+        if not byte_ranges and stat.st_size > TAIL_BYTES:
+            # Signatures of single-revision PDFs usually sit mid-file rather than in the last update.
+            byte_ranges = _find_byte_ranges(f, stat.st_size)
+
+        for match in byte_ranges:
+            digest.update(match.group(0))
+            start, length, gap_end = (int(match.group(index)) for index in (1, 2, 3))
+            gap_start = start + length
+            if 0 <= gap_start < gap_end <= stat.st_size:
+                f.seek(gap_start)
+                digest.update(f.read(gap_end - gap_start))
+        if not byte_ranges:
+            digest.update(tail)
+    return f"{stat.st_size}:{stat.st_mtime_ns}:{digest.hexdigest()}"
+
+
+class SignatureCache:
+    def __init__(self, path):
+        self.path = path
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=5, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS signatures ("
+                "fingerprint TEXT PRIMARY KEY, signed INTEGER NOT NULL, signer TEXT NOT NULL, "
+                "pdf_name TEXT, checked_at TEXT)")
+
+    def get(self, fingerprint):
+        """Return (signed, signer) for a known fingerprint, else None."""
+        with self._lock:
+            row = self._conn.execute("SELECT signed, signer FROM signatures WHERE fingerprint = ?",
+                                     (fingerprint,)).fetchone()
+        return (bool(row[0]), row[1]) if row else None
+
+    def put(self, fingerprint, signed, signer, pdf_path=None):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO signatures (fingerprint, signed, signer, pdf_name, checked_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (fingerprint, int(bool(signed)), signer or '', os.path.basename(pdf_path) if pdf_path else None,
+                 datetime.now().isoformat(timespec='seconds')))
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM signatures")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+@functools.lru_cache(maxsize=None)
+def get_signature_cache():
+    """The process-wide cache, or None when disabled or the database cannot be opened."""
+    setting = os.environ.get(SIGNATURE_CACHE_ENV, '').strip()
+    if setting.lower() in ('0', 'off', 'false', 'no'):
+        return None
+    try:
+        return SignatureCache(setting or default_cache_path())
+    except (sqlite3.Error, OSError):
+        # Read-only profile or locked file: validate without the cache.
+        return None
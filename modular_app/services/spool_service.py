@@ -1,63 +1,159 @@
-from ..config import LINE_LENGTH
-from ..utils import format_date
+import json
+import os
+from datetime import datetime
 
+from ..config import LINE_LENGTH, SPOOL_LAYOUT
+from .date_service import normalize_date
+from .timing import timed
 
-def generate_spool_line(row_data, header_values, invoice_data, is_spare):
-    line = [' '] * LINE_LENGTH
 
+def _spool_field_values(row_data, header_values, invoice_data, is_spare):
+    """Value of every SPOOL_LAYOUT field for one row; fields left out stay blank."""
     row_data = {k: str(v) if v is not None else '' for k, v in row_data.items()}
 
-    def set_field(start, end, value, align='left'):
-        width = end - start
-        value_str = str(value) if value else ''
-        if align == 'left':
-            formatted = value_str[:width].ljust(width)
-        else:
-            formatted = value_str[:width].rjust(width)
-        for i, char in enumerate(formatted):
-            if start + i < LINE_LENGTH:
-                line[start + i] = char
-
     invoice_date_raw = header_values.get('invoice_date')
     challan_date_raw = header_values.get('challan_date') or invoice_date_raw
+    bin_qty_val = str(row_data.get('bin_qty', '')).strip()
 
-    challan_date = format_date(challan_date_raw, '%d-%b-%Y')
-    invoice_date = format_date(invoice_date_raw, '%d-%b-%Y', upper=True)
+    values = {
+        'vendor_code': header_values.get('vendor_code') or 'X539',
+        'challan_no': header_values.get('challan_no') or header_values.get('invoice_no'),
+        'challan_date': normalize_date(challan_date_raw, '%d-%b-%Y'),
+        'invoice_no': header_values.get('invoice_no'),
+        'invoice_date': normalize_date(invoice_date_raw, '%d-%b-%Y', upper=True),
+        'oe_prefix': '1' if not is_spare else 'S',
+        'schedule_no': row_data.get('schedule_no', ''),
+        'item_code': row_data.get('item_code', ''),
+        'qty': row_data.get('qty', ''),
+        'po_number': header_values.get('po_number'),
+        'bin_qty': f"    {bin_qty_val}" if bin_qty_val else '',
+        'gst_no': row_data.get('gst_no', ''),
+        'hsn_code': row_data.get('hsn_code', ''),
+        'cgst_amt': row_data.get('cgst_amt') or '0',
+        'sgst_amt': row_data.get('sgst_amt') or '0',
+        'eway_bill': row_data.get('eway_bill') or '0',
+        'igst_amt': row_data.get('igst_amt', ''),
+        'irn_number': invoice_data.get('irn_number', ''),
+        'basic_price': row_data.get('basic_price', ''),
+        'total_value': row_data.get('total_value', ''),
+    }
+    if is_spare and row_data.get('batch_no'):
+        values['batch_no'] = row_data['batch_no'].strip()
+    return values
 
-    set_field(0, 4, header_values.get('vendor_code') or 'X539')
-    set_field(4, 20, header_values.get('challan_no') or header_values.get('invoice_no'))
-    set_field(20, 31, challan_date)
-    set_field(31, 47, header_values.get('invoice_no'))
-    set_field(47, 71, invoice_date)
 
-    oe_prefix = '1' if not is_spare else 'S'
-    set_field(82, 83, oe_prefix)
-    set_field(83, 98, row_data.get('schedule_no', ''))
-    set_field(98, 113, row_data.get('item_code', ''))
-    set_field(113, 125, row_data.get('qty', ''))
-    set_field(125, 138, header_values.get('po_number'))
+@timed('format')
+def generate_spool_line(row_data, header_values, invoice_data, is_spare):
+    """One fixed-width spool line; column positions come from config.SPOOL_LAYOUT."""
+    values = _spool_field_values(row_data, header_values, invoice_data, is_spare)
+    line = [' '] * LINE_LENGTH
+    for field, start, end in SPOOL_LAYOUT:
+        value = values.get(field)
+        width = end - start
+        line[start:end] = (str(value) if value else '')[:width].ljust(width)
+    return ''.join(line)
 
-    bin_qty_val = str(row_data.get('bin_qty', '')).strip()
-    bin_qty_field = f"    {bin_qty_val}" if bin_qty_val else ''
-    set_field(138, 150, bin_qty_field)
 
-    if is_spare and row_data.get('batch_no'):
-        set_field(194, 204, str(row_data['batch_no']).strip())
+def spool_filename(invoice_no):
+    default_filename = invoice_no.split('/')[-1] if '/' in invoice_no else invoice_no
+    return f"{default_filename}.txt"
 
-    set_field(204, 219, row_data.get('gst_no', ''))
-    set_field(219, 227, row_data.get('hsn_code', ''))
 
-    cgst = str(row_data.get('cgst_amt')) if row_data.get('cgst_amt') else '0'
-    sgst = str(row_data.get('sgst_amt')) if row_data.get('sgst_amt') else '0'
-    cgst_portion = cgst.ljust(16) + sgst[:2]
-    set_field(227, 245, cgst_portion)
-    sgst_portion = sgst[2:] if len(sgst) > 2 else ''
-    set_field(245, 265, sgst_portion)
+@timed('write')
+def write_spool_file(output_path, lines):
+    count = 0
+    with open(output_path, 'w', encoding='utf-8') as f:
+        for line in lines:
+            f.write(line + '\n')
+            count += 1
+    return count
 
-    set_field(275, 276, str(row_data.get('eway_bill')) if row_data.get('eway_bill') else '0')
-    set_field(276, 290, row_data.get('igst_amt', ''))
-    set_field(290, 354, invoice_data.get('irn_number', ''))
-    set_field(354, 366, row_data.get('basic_price', ''))
-    set_field(366, 390, row_data.get('total_value', ''))
 
-    return ''.join(line)
+class ConsolidatedSpoolWriter:
+    """Streams every invoice into one daily spool file plus an offset manifest.
+
+    A later run on the same day appends to the file and extends its manifest;
+    invoices already in the day's file are not written again (see contains).
+    append=False starts the day's file afresh.
+    """
+
+    def __init__(self, output_folder, spool_date=None, prefix='SPOOL', append=True):
+        spool_date = spool_date or datetime.now()
+        base_name = f"{prefix}_{spool_date.strftime('%Y%m%d')}"
+        self.path = os.path.join(output_folder, f"{base_name}.txt")
+        self.manifest_path = os.path.join(output_folder, f"{base_name}.manifest.json")
+        self.spool_date = spool_date
+        self.append = append
+        self.entries = []
+        self.line_count = 0
+        self.lines_written = 0
+        self._invoice_nos = set()
+        self._file = None
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def open(self):
+        if self.append and os.path.exists(self.path):
+            self.entries, self.line_count = self._load_existing()
+            self._invoice_nos = {entry.get('invoice_no') for entry in self.entries}
+            self._file = open(self.path, 'a', encoding='utf-8')
+        else:
+            self._file = open(self.path, 'w', encoding='utf-8')
+
+    def _load_existing(self):
+        """Entries and line count of the day's file written so far."""
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            entries = list(manifest['invoices'])
+        except (OSError, ValueError, KeyError, TypeError):
+            entries = []
+        with open(self.path, 'r', encoding='utf-8') as f:
+            line_count = sum(1 for _ in f)
+        return entries, line_count
+
+    def contains(self, invoice_no):
+        """True when the day's file already holds this invoice."""
+        return invoice_no in self._invoice_nos
+
+    @timed('write')
+    def write_invoice(self, invoice_no, lines):
+        offset = self._file.tell()
+        first_line = self.line_count + 1
+        count = 0
+        for line in lines:
+            self._file.write(line + '\n')
+            count += 1
+        self.line_count += count
+        self.lines_written += count
+        self._invoice_nos.add(invoice_no)
+        self.entries.append({
+            'invoice_no': invoice_no,
+            'offset': offset,
+            'length': self._file.tell() - offset,
+            'first_line': first_line,
+            'line_count': count,
+        })
+        return count
+
+    def close(self):
+        if self._file is None:
+            return
+        self._file.close()
+        self._file = None
+
+        manifest = {
+            'spool_file': os.path.basename(self.path),
+            'spool_date': self.spool_date.strftime('%d-%m-%Y'),
+            'line_length': LINE_LENGTH,
+            'line_count': self.line_count,
+            'invoices': self.entries,
+        }
+        with open(self.manifest_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
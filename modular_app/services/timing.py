@@ -0,0 +1,209 @@
+"""Lightweight stage timing for the spool pipeline.
+
+Disabled by default; a disabled hook costs one global check per call. After
+enable_timing(), every timed stage is attributed to the invoice being
+processed in the current context. When that invoice finishes, one JSON record
+per stage and one for the invoice are logged to the 'spool.timing' logger,
+and the recorder keeps the durations for a p50/p95/max batch summary.
+
+Stage times nest: 'validate' includes the 'signature' check it runs.
+
+SPOOL_TIMING_LOG=<file> (or '-' for stderr) turns the JSON log on for the GUI
+and is the default of the CLI's --timing-log.
+
+enable_tracing() attaches a tracer (see tracing.ChromeTracer) to the same
+hooks; it receives every stage call and invoice as a timestamped span.
+"""
+import contextlib
+import contextvars
+import functools
+import json
+import logging
+import math
+import os
+import sys
+import threading
+import time
+
+logger = logging.getLogger('spool.timing')
+
+TIMING_LOG_ENV = 'SPOOL_TIMING_LOG'
+
+_recorder = None
+_tracer = None
+_current_invoice = contextvars.ContextVar('spool_timing_invoice', default=None)
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[max(0, math.ceil(fraction * len(sorted_values)) - 1)]
+
+
+def summarize_durations(values):
+    ordered = sorted(values)
+    return {
+        'count': len(ordered),
+        'total': round(sum(ordered), 6),
+        'p50': round(percentile(ordered, 0.50), 6),
+        'p95': round(percentile(ordered, 0.95), 6),
+        'max': round(ordered[-1], 6) if ordered else 0.0,
+    }
+
+
+class TimingRecorder:
+    """Collects per-invoice stage durations for the batch summary."""
+
+    def __init__(self):
+        self.stage_times = {}
+        self.invoice_times = []
+        self._lock = threading.Lock()
+
+    def add_stage(self, name, seconds):
+        with self._lock:
+            self.stage_times.setdefault(name, []).append(seconds)
+
+    def add_invoice(self, seconds):
+        with self._lock:
+            self.invoice_times.append(seconds)
+
+    def summary(self):
+        with self._lock:
+            return {
+                'invoices': summarize_durations(self.invoice_times),
+                'stages': {name: summarize_durations(values) for name, values in sorted(self.stage_times.items())},
+            }
+
+
+class _InvoiceTiming:
+    __slots__ = ('invoice', 'stages')
+
+    def __init__(self, invoice):
+        self.invoice = invoice
+        self.stages = {}
+
+
+def enable_timing(recorder=None):
+    global _recorder
+    _recorder = recorder or TimingRecorder()
+    return _recorder
+
+
+def disable_timing():
+    global _recorder
+    recorder, _recorder = _recorder, None
+    return recorder
+
+
+def timing_enabled():
+    return _recorder is not None
+
+
+def enable_tracing(tracer):
+    global _tracer
+    _tracer = tracer
+    return tracer
+
+
+def disable_tracing():
+    global _tracer
+    tracer, _tracer = _tracer, None
+    return tracer
+
+
+def timing_log_requested():
+    """The SPOOL_TIMING_LOG target, or None when unset."""
+    return os.environ.get(TIMING_LOG_ENV, '').strip() or None
+
+
+def enable_timing_log(path):
+    """Enable timing and write its JSON records, one per line, to `path` ('-' for stderr)."""
+    handler = logging.StreamHandler(sys.stderr) if path == '-' else logging.FileHandler(path, encoding='utf-8')
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    return enable_timing()
+
+
+def close_timing_log():
+    """Log the batch summary, disable timing and detach the log handlers. Returns the summary."""
+    recorder = disable_timing()
+    summary = recorder.summary() if recorder else None
+    if summary:
+        emit(dict(summary, type='summary'))
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+        handler.close()
+    return summary
+
+
+def emit(record):
+    logger.info(json.dumps(record, sort_keys=True, default=str))
+
+
+@contextlib.contextmanager
+def stage(name):
+    """Time a block as one call of stage `name`."""
+    recorder, tracer = _recorder, _tracer
+    if recorder is None and tracer is None:
+        yield
+        return
+
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - started
+        current = _current_invoice.get()
+        if tracer is not None:
+            tracer.add_span(name, 'stage', started, seconds, current.invoice if current else None)
+        if recorder is not None and current is None:
+            recorder.add_stage(name, seconds)
+            emit({'type': 'stage', 'invoice': None, 'stage': name, 'seconds': round(seconds, 6), 'calls': 1})
+        elif recorder is not None:
+            totals = current.stages.setdefault(name, [0.0, 0])
+            totals[0] += seconds
+            totals[1] += 1
+
+
+def timed(name):
+    """Decorator form of stage()."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _recorder is None and _tracer is None:
+                return func(*args, **kwargs)
+            with stage(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+@contextlib.contextmanager
+def invoice_timing(invoice):
+    """Attribute stages inside the block to `invoice`; the outermost block wins when nested."""
+    recorder, tracer = _recorder, _tracer
+    if (recorder is None and tracer is None) or _current_invoice.get() is not None:
+        yield
+        return
+
+    current = _InvoiceTiming(invoice)
+    token = _current_invoice.set(current)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        total = time.perf_counter() - started
+        _current_invoice.reset(token)
+        if tracer is not None:
+            tracer.add_span(os.path.basename(str(invoice)), 'invoice', started, total, invoice)
+        if recorder is not None:
+            for name, (seconds, calls) in current.stages.items():
+                recorder.add_stage(name, seconds)
+                emit({'type': 'stage', 'invoice': invoice, 'stage': name, 'seconds': round(seconds, 6),
+                      'calls': calls})
+            recorder.add_invoice(total)
+            emit({'type': 'invoice', 'invoice': invoice, 'seconds': round(total, 6),
+                  'stages': {name: round(seconds, 6) for name, (seconds, _) in current.stages.items()}})
@@ -0,0 +1,55 @@
+"""Chrome trace-event export of pipeline stages, per invoice and per worker thread.
+
+The trace opens in Perfetto (ui.perfetto.dev) or chrome://tracing. Each
+worker thread is one track. Every invoice is a span on its track, and the
+stages it ran nest inside that span, so overlap between workers and idle gaps
+are visible directly.
+"""
+import json
+import os
+import threading
+import time
+
+
+class ChromeTracer:
+    def __init__(self, process_name='spool'):
+        self.process_name = process_name
+        self.pid = os.getpid()
+        self._origin = time.perf_counter()
+        self._events = []
+        self._threads = {}
+        self._lock = threading.Lock()
+
+    def add_span(self, name, category, started, seconds, invoice=None):
+        """Record a finished span; `started` is a time.perf_counter() value."""
+        thread = threading.current_thread()
+        event = {
+            'name': name,
+            'cat': category,
+            'ph': 'X',
+            'ts': round((started - self._origin) * 1e6, 3),
+            'dur': round(seconds * 1e6, 3),
+            'pid': self.pid,
+            'tid': thread.ident,
+        }
+        if invoice is not None:
+            event['args'] = {'invoice': invoice}
+        with self._lock:
+            self._threads.setdefault(thread.ident, thread.name)
+            self._events.append(event)
+
+    def to_dict(self):
+        with self._lock:
+            metadata = [{'name': 'process_name', 'ph': 'M', 'pid': self.pid, 'tid': 0,
+                         'args': {'name': self.process_name}}]
+            metadata += [{'name': 'thread_name', 'ph': 'M', 'pid': self.pid, 'tid': tid, 'args': {'name': name}}
+                         for tid, name in self._threads.items()]
+            return {'traceEvents': metadata + sorted(self._events, key=lambda event: event['ts']),
+                    'displayTimeUnit': 'ms'}
+
+    def save(self, path):
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f)
+        os.replace(tmp_path, path)
+        return path
@@ -1,87 +1,141 @@
+import operator
 import re
 
 from ..config import GSTIN_PATTERN
+from ..models import PreviewRow
 
+GSTIN_RE = re.compile(GSTIN_PATTERN, re.IGNORECASE)
 
-def validate_required_fields(header_values, invoice_data=None):
-    required_fields = {
-        'vendor_code': 'Vendor Code',
-        'challan_no': 'Challan No',
-        'challan_date': 'Challan Date',
-        'invoice_no': 'Invoice No',
-        'invoice_date': 'Invoice Date',
-        'po_number': 'PO Number',
-    }
+REQUIRED_HEADER_FIELDS = {
+    'vendor_code': 'Vendor Code',
+    'challan_no': 'Challan No',
+    'challan_date': 'Challan Date',
+    'invoice_no': 'Invoice No',
+    'invoice_date': 'Invoice Date',
+    'po_number': 'PO Number',
+}
 
-    missing = []
-    invoice_data = invoice_data or {}
+COMMON_REQUIRED_ROW_FIELDS = [
+    'unload_no',
+    'schedule_no',
+    'item_code',
+    'qty',
+    'po_number',
+    'gst_no',
+    'hsn_code',
+    'cgst_amt',
+    'sgst_amt',
+    'basic_price',
+    'total_value',
+]
+OE_REQUIRED_ROW_FIELDS = COMMON_REQUIRED_ROW_FIELDS + ['bin_qty']
+SPARE_REQUIRED_ROW_FIELDS = COMMON_REQUIRED_ROW_FIELDS + ['batch_no', 'bin_qty']
 
-    for field_id, field_name in required_fields.items():
-        value = header_values.get(field_id, '') or invoice_data.get(field_id, '')
-        if not value or not str(value).strip():
-            missing.append(field_name)
+ROW_FIELD_NAMES = {
+    'unload_no': 'Unload No',
+    'schedule_no': 'Schedule No (KANBAN)',
+    'item_code': 'Item Code (Part No)',
+    'qty': 'Qty',
+    'po_number': 'PO Number',
+    'bin_qty': 'Bin Qty',
+    'batch_no': 'Batch No',
+    'gst_no': 'GST No',
+    'hsn_code': 'HSN Code',
+    'cgst_amt': 'CGST Amount',
+    'sgst_amt': 'SGST Amount',
+    'basic_price': 'Basic Price',
+    'total_value': 'Total Invoice Value',
+}
 
-    if missing:
-        return False, f"Missing required fields:\n• " + "\n• ".join(missing)
-    return True, ""
 
+def _text(value):
+    return str(value).strip() if value else ''
 
-def validate_preview_rows(preview_data, is_spare):
-    common_required = [
-        'unload_no',
-        'schedule_no',
-        'item_code',
-        'qty',
-        'po_number',
-        'gst_no',
-        'hsn_code',
-        'cgst_amt',
-        'sgst_amt',
-        'basic_price',
-        'total_value',
-    ]
-
-    oe_required = common_required + ['bin_qty']
-    spare_required = common_required + ['batch_no', 'bin_qty']
-    required_fields = spare_required if is_spare else oe_required
-
-    field_names = {
-        'unload_no': 'Unload No',
-        'schedule_no': 'Schedule No (KANBAN)',
-        'item_code': 'Item Code (Part No)',
-        'qty': 'Qty',
-        'po_number': 'PO Number',
-        'bin_qty': 'Bin Qty',
-        'batch_no': 'Batch No',
-        'gst_no': 'GST No',
-        'hsn_code': 'HSN Code',
-        'cgst_amt': 'CGST Amount',
-        'sgst_amt': 'SGST Amount',
-        'basic_price': 'Basic Price',
-        'total_value': 'Total Invoice Value',
-    }
-
-    errors = []
-
-    for row_idx, row in enumerate(preview_data):
-        row_errors = []
-        for field_id in required_fields:
-            value = row.get(field_id, '')
-            if not value or not str(value).strip():
-                row_errors.append(field_names.get(field_id, field_id))
-
-        gst_no = row.get('gst_no', '')
-        if gst_no and str(gst_no).strip():
-            gst_no = str(gst_no).strip()
-            if not re.match(GSTIN_PATTERN, gst_no, re.IGNORECASE):
-                row_errors.append(f"GST No format invalid ({gst_no})")
-            else:
-                state_code = int(gst_no[:2])
-                if state_code < 1 or state_code > 37:
-                    row_errors.append(f"GST No state code invalid ({state_code})")
-
-        if row_errors:
-            item_code = row.get('item_code', f'Row {row_idx + 1}')
-            errors.append(f"Row '{item_code}': {', '.join(row_errors)}")
 
+def _gstin_problem(gst_no):
+    if not GSTIN_RE.match(gst_no):
+        return f"GST No format invalid ({gst_no})"
+    state_code = int(gst_no[:2])
+    if state_code < 1 or state_code > 37:
+        return f"GST No state code invalid ({state_code})"
+    return None
+
+
+def _missing_headers(header_values, invoice_data):
+    return [field_name for field_id, field_name in REQUIRED_HEADER_FIELDS.items()
+            if not _text(header_values.get(field_id, '') or invoice_data.get(field_id, ''))]
+
+
+def _format_missing_headers(missing):
+    return "Missing required fields:\n• " + "\n• ".join(missing) if missing else ""
+
+
+def _columns(rows, fields):
+    """One list per field holding that field of every row."""
+    if not rows:
+        return [[] for _ in fields]
+    if all(type(row) is PreviewRow for row in rows):
+        # PreviewRow fields are slots; attrgetter reads them without a Python-level call per field.
+        return [list(column) for column in zip(*map(operator.attrgetter(*fields), rows))]
+    return [[row.get(field_id, '') for row in rows] for field_id in fields]
+
+
+def _row_problems(rows, is_spare):
+    """Per-row lists of problems, checked column by column.
+
+    Each required field is pulled out as one column and scanned once; GSTINs
+    are validated once per distinct value, since a batch normally carries
+    only a handful of them.
+    """
+    problems = [[] for _ in rows]
+    required = SPARE_REQUIRED_ROW_FIELDS if is_spare else OE_REQUIRED_ROW_FIELDS
+    columns = _columns(rows, required)
+    for field_id, column in zip(required, columns):
+        field_name = ROW_FIELD_NAMES.get(field_id, field_id)
+        for index in [index for index, value in enumerate(column) if not value or not str(value).strip()]:
+            problems[index].append(field_name)
+
+    gst_column = [_text(value) for value in columns[required.index('gst_no')]]
+    verdicts = {gst_no: _gstin_problem(gst_no) for gst_no in set(gst_column) if gst_no}
+    for index, gst_no in enumerate(gst_column):
+        if gst_no and verdicts[gst_no]:
+            problems[index].append(verdicts[gst_no])
+    return problems
+
+
+def _format_row_errors(rows, problems):
+    return [f"Row '{row.get('item_code', f'Row {row_idx + 1}')}': {', '.join(row_problems)}"
+            for row_idx, (row, row_problems) in enumerate(zip(rows, problems)) if row_problems]
+
+
+def validate_required_fields(header_values, invoice_data=None):
+    missing = _missing_headers(header_values, invoice_data or {})
+    return not missing, _format_missing_headers(missing)
+
+
+def validate_preview_rows(preview_data, is_spare):
+    errors = _format_row_errors(preview_data, _row_problems(preview_data, is_spare))
     return len(errors) == 0, errors
+
+
+def validate_previews(previews, is_spare):
+    """Header and row validation of a whole batch in one pass over all rows.
+
+    Returns one entry per preview, in order:
+    {'header_error': message or '', 'row_errors': [message, ...]}, with the
+    same messages as validate_required_fields/validate_preview_rows.
+    """
+    rows = [row for preview in previews for row in preview['preview_data']]
+    problems = _row_problems(rows, is_spare)
+
+    results = []
+    offset = 0
+    for preview in previews:
+        count = len(preview['preview_data'])
+        header_values = {field: _text(value) for field, value in preview['header_data'].items()}
+        results.append({
+            'header_error': _format_missing_headers(_missing_headers(header_values, preview['invoice_data'])),
+            'row_errors': _format_row_errors(preview['preview_data'], problems[offset:offset + count]),
+        })
+        offset += count
+    return results
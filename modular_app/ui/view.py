@@ -4,6 +4,7 @@ import os
 from PIL import Image, ImageTk  # Added for Nagarkot GUI standards
 
 from ..config import COLUMNS
+from .virtual_table import VirtualTable
 
 
 class SpoolAppView:
@@ -194,6 +195,14 @@ class SpoolAppView:
         self.header_entries['sales_tax'] = ttk.Entry(header_frame, width=15)
         self.header_entries['sales_tax'].grid(row=1, column=7, sticky=tk.W, padx=5, pady=2)
 
+        self._dirty_headers = set()
+        self._loading_headers = False
+        for field, entry in self.header_entries.items():
+            var = tk.StringVar()
+            var.trace_add('write', lambda *args, field=field: self._mark_header_dirty(field))
+            entry.configure(textvariable=var)
+            entry.var = var
+
         ttk.Label(header_frame, text="OE/Spares:", style="Header.TLabel").grid(row=2, column=0, sticky=tk.W, padx=5, pady=2)
 
         self.oe_spares_var = tk.StringVar(value="OE")
@@ -203,6 +212,10 @@ class SpoolAppView:
         ttk.Radiobutton(radio_frame, text="O/E", variable=self.oe_spares_var, value="OE").pack(side=tk.LEFT, padx=5)
         ttk.Radiobutton(radio_frame, text="Spare", variable=self.oe_spares_var, value="Spare").pack(side=tk.LEFT, padx=5)
 
+        self.consolidated_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(header_frame, text="Single daily spool file", variable=self.consolidated_var).grid(
+            row=2, column=2, columnspan=2, sticky=tk.W, padx=5, pady=2)
+
         button_frame = ttk.Frame(main_frame)
         button_frame.pack(fill=tk.X, pady=10)
 
@@ -215,8 +228,20 @@ class SpoolAppView:
             ("Close", self.callbacks['close'], "Action.TButton"),
         ]
 
+        self.action_buttons = {}
         for text, command, style in buttons:
-            ttk.Button(button_frame, text=text, command=command, style=style).pack(side=tk.LEFT, padx=5)
+            button = ttk.Button(button_frame, text=text, command=command, style=style)
+            button.pack(side=tk.LEFT, padx=5)
+            self.action_buttons[text] = button
+
+        self.cancel_btn = ttk.Button(button_frame, text="Cancel", command=self.callbacks['cancel'],
+                                     style="Action.TButton", state='disabled')
+        self.cancel_btn.pack(side=tk.LEFT, padx=5)
+
+        self.progress_text_var = tk.StringVar(value="")
+        ttk.Label(button_frame, textvariable=self.progress_text_var).pack(side=tk.RIGHT, padx=5)
+        self.progress_bar = ttk.Progressbar(button_frame, orient=tk.HORIZONTAL, length=220, mode='determinate')
+        self.progress_bar.pack(side=tk.RIGHT, padx=5)
 
         table_frame = ttk.LabelFrame(main_frame, text="Preview Table (Double-click to edit)", padding="5")
         table_frame.pack(fill=tk.BOTH, expand=True, pady=(0, 10))
@@ -233,29 +258,19 @@ class SpoolAppView:
         self.next_btn = ttk.Button(nav_frame, text="Next ▶", command=self.callbacks['next_preview'], state='disabled')
         self.next_btn.pack(side=tk.LEFT, padx=5)
 
-        tree_container = ttk.Frame(table_frame)
-        tree_container.pack(fill=tk.BOTH, expand=True)
-
-        h_scroll = ttk.Scrollbar(tree_container, orient=tk.HORIZONTAL)
-        h_scroll.pack(side=tk.BOTTOM, fill=tk.X)
-
-        v_scroll = ttk.Scrollbar(tree_container, orient=tk.VERTICAL)
-        v_scroll.pack(side=tk.RIGHT, fill=tk.Y)
-
-        columns = [col[0] for col in COLUMNS]
-        self.tree = ttk.Treeview(tree_container, columns=columns, show='headings',
-                                  xscrollcommand=h_scroll.set, yscrollcommand=v_scroll.set)
-        self.tree.pack(fill=tk.BOTH, expand=True)
-
-        h_scroll.config(command=self.tree.xview)
-        v_scroll.config(command=self.tree.yview)
-
-        for col_id, col_name, col_width in COLUMNS:
-            self.tree.heading(col_id, text=col_name)
-            self.tree.column(col_id, width=col_width, minwidth=50)
+        self.table = VirtualTable(table_frame, COLUMNS)
+        self.table.pack(fill=tk.BOTH, expand=True)
+        self.tree = self.table.tree
 
         self.tree.bind('<Double-1>', self._on_cell_double_click)
 
+        # Hidden diagnostics menu for support: not shown anywhere in the UI.
+        self.profiling_var = tk.BooleanVar(value=False)
+        self.diagnostics_menu = tk.Menu(self.root, tearoff=0)
+        self.diagnostics_menu.add_checkbutton(label="Profile Load Preview / Generate (cProfile)",
+                                              variable=self.profiling_var)
+        self.root.bind('<Control-Shift-P>', self._show_diagnostics_menu)
+
         # === FOOTER / STATUS BAR ===
         footer_frame = ttk.Frame(self.root, style="Status.TFrame", padding=(10, 5))
         footer_frame.pack(side=tk.BOTTOM, fill=tk.X)
@@ -274,7 +289,8 @@ class SpoolAppView:
         column = self.tree.identify_column(event.x)
         row = self.tree.identify_row(event.y)
 
-        if not row:
+        row_index = self.table.row_index(row)
+        if row_index is None:
             return
 
         col_idx = int(column[1:]) - 1
@@ -284,8 +300,8 @@ class SpoolAppView:
         if not bbox:
             return
 
-        item = self.tree.item(row)
-        current_value = item['values'][col_idx]
+        # Read from the row store; Treeview values come back with numbers coerced.
+        current_value = self.table.get_value(row_index, col_id)
 
         entry = ttk.Entry(self.tree, width=bbox[2])
         entry.place(x=bbox[0], y=bbox[1], width=bbox[2], height=bbox[3])
@@ -294,11 +310,12 @@ class SpoolAppView:
         entry.focus()
 
         def save_edit(event=None):
+            if not entry.winfo_exists():
+                return
             new_value = entry.get()
-            values = list(item['values'])
-            values[col_idx] = new_value
-            self.tree.item(row, values=values)
             entry.destroy()
+            if row_index < len(self.table.rows):
+                self.table.set_value(row_index, col_id, new_value)
 
         def cancel_edit(event=None):
             entry.destroy()
@@ -307,6 +324,10 @@ class SpoolAppView:
         entry.bind('<Escape>', cancel_edit)
         entry.bind('<FocusOut>', save_edit)
 
+    def _mark_header_dirty(self, field):
+        if not self._loading_headers:
+            self._dirty_headers.add(field)
+
     def set_status(self, message, style='normal'):
         self.status_var.set(message)
         if style == 'success':
@@ -319,6 +340,24 @@ class SpoolAppView:
             self.status_bar.configure(style='TLabel')
         self.root.update()
 
+    def set_busy(self, busy):
+        # Close stays usable so a long batch can still be abandoned.
+        for text, button in self.action_buttons.items():
+            if text != "Close":
+                button.config(state='disabled' if busy else 'normal')
+        self.cancel_btn.config(state='normal' if busy else 'disabled')
+        if busy:
+            self.prev_btn.config(state='disabled')
+            self.next_btn.config(state='disabled')
+
+    def set_progress(self, value, maximum, text=''):
+        self.progress_bar.config(maximum=max(maximum, 1), value=value)
+        self.progress_text_var.set(text)
+
+    def reset_progress(self):
+        self.progress_bar.config(value=0)
+        self.progress_text_var.set("")
+
     def set_invoice_path_display(self, text):
         self.invoice_path_var.set(text)
 
@@ -338,31 +377,47 @@ class SpoolAppView:
     def get_oe_spares(self):
         return self.oe_spares_var.get()
 
+    def get_consolidated_output(self):
+        return self.consolidated_var.get()
+
+    def get_profiling_enabled(self):
+        return self.profiling_var.get()
+
+    def _show_diagnostics_menu(self, event):
+        try:
+            self.diagnostics_menu.tk_popup(event.x_root, event.y_root)
+        finally:
+            self.diagnostics_menu.grab_release()
+
     def get_header_values(self):
         return {field: entry.get().strip() for field, entry in self.header_entries.items()}
 
     def set_header_values(self, data):
-        for field, entry in self.header_entries.items():
-            entry.delete(0, tk.END)
-            if field in data:
-                entry.insert(0, data[field])
+        self._loading_headers = True
+        try:
+            for field, entry in self.header_entries.items():
+                entry.delete(0, tk.END)
+                if field in data:
+                    entry.insert(0, data[field])
+        finally:
+            self._loading_headers = False
+        self._dirty_headers.clear()
+
+    def get_dirty_headers(self):
+        """Header fields edited since the last set_header_values/clear_dirty."""
+        return {field: self.header_entries[field].get().strip() for field in self._dirty_headers}
+
+    def get_dirty_cells(self):
+        """Table edits since the last set_table_rows/clear_dirty, as {(row_index, col_id): value}."""
+        return dict(self.table.edits)
+
+    def clear_dirty(self):
+        self._dirty_headers.clear()
+        self.table.clear_edits()
 
     def clear_table(self):
-        for item in self.tree.get_children():
-            self.tree.delete(item)
+        self.table.clear()
 
     def set_table_rows(self, rows):
-        self.clear_table()
-        for row_data in rows:
-            values = [row_data[col[0]] for col in COLUMNS]
-            self.tree.insert('', 'end', values=values)
-
-    def get_table_rows(self):
-        rows = []
-        for item_id in self.tree.get_children():
-            values = self.tree.item(item_id)['values']
-            row_data = {}
-            for col_idx, (col_id, _, _) in enumerate(COLUMNS):
-                row_data[col_id] = values[col_idx]
-            rows.append(row_data)
-        return rows
+        # The rows are shown as-is; edits stay in the table's overlay until saved.
+        self.table.set_rows(rows)
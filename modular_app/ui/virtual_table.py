@@ -0,0 +1,141 @@
+import tkinter as tk
+from tkinter import ttk
+
+
+class VirtualTable:
+    """Treeview that only keeps the visible window of a row store as items.
+
+    Rows live in a plain list of dicts. Scrolling re-fills a small pool of
+    Treeview items instead of inserting one item per row, so loading or
+    navigating a preview with thousands of rows costs the same as one with
+    twenty. Edits are kept in an overlay keyed by (row_index, col_id) and
+    never touch the row store, so the owner can write back just those cells.
+    """
+
+    def __init__(self, parent, columns):
+        self.columns = columns
+        self.col_ids = [col[0] for col in columns]
+        self.rows = []
+        self.edits = {}
+        self.offset = 0
+        self._items = []
+        self._row_height = int(ttk.Style().lookup('Treeview', 'rowheight') or 25)
+
+        self.container = ttk.Frame(parent)
+
+        h_scroll = ttk.Scrollbar(self.container, orient=tk.HORIZONTAL)
+        h_scroll.pack(side=tk.BOTTOM, fill=tk.X)
+
+        self.v_scroll = ttk.Scrollbar(self.container, orient=tk.VERTICAL, command=self._on_yscroll)
+        self.v_scroll.pack(side=tk.RIGHT, fill=tk.Y)
+
+        self.tree = ttk.Treeview(self.container, columns=self.col_ids, show='headings',
+                                 xscrollcommand=h_scroll.set)
+        self.tree.pack(fill=tk.BOTH, expand=True)
+        h_scroll.config(command=self.tree.xview)
+
+        for col_id, col_name, col_width in columns:
+            self.tree.heading(col_id, text=col_name)
+            self.tree.column(col_id, width=col_width, minwidth=50)
+
+        self.tree.bind('<Configure>', lambda event: self.refresh())
+        self.tree.bind('<MouseWheel>', self._on_mousewheel)
+        self.tree.bind('<Button-4>', lambda event: self.scroll_by(-3))
+        self.tree.bind('<Button-5>', lambda event: self.scroll_by(3))
+        self.tree.bind('<Prior>', lambda event: self.scroll_by(-self.visible_count()))
+        self.tree.bind('<Next>', lambda event: self.scroll_by(self.visible_count()))
+        self.tree.bind('<Home>', lambda event: self.scroll_to(0))
+        self.tree.bind('<End>', lambda event: self.scroll_to(len(self.rows)))
+
+    def pack(self, **kwargs):
+        self.container.pack(**kwargs)
+
+    def visible_count(self):
+        height = self.tree.winfo_height()
+        if height <= 1:
+            # Not mapped yet; fill a reasonable window and correct on <Configure>.
+            return 30
+        # One row height is taken by the headings.
+        return max(1, height // self._row_height - 1)
+
+    def set_rows(self, rows):
+        self.rows = rows
+        self.edits = {}
+        self.offset = 0
+        self.tree.selection_remove(self.tree.selection())
+        self.refresh()
+
+    def clear(self):
+        self.set_rows([])
+
+    def row_index(self, item_id):
+        if item_id not in self._items:
+            return None
+        index = self.offset + self._items.index(item_id)
+        return index if index < len(self.rows) else None
+
+    def get_value(self, row_index, col_id):
+        if (row_index, col_id) in self.edits:
+            return self.edits[(row_index, col_id)]
+        return self.rows[row_index].get(col_id, '')
+
+    def set_value(self, row_index, col_id, value):
+        if value == self.rows[row_index].get(col_id, ''):
+            self.edits.pop((row_index, col_id), None)
+        else:
+            self.edits[(row_index, col_id)] = value
+        slot = row_index - self.offset
+        if 0 <= slot < len(self._items):
+            self.tree.item(self._items[slot], values=self._row_values(row_index))
+
+    def clear_edits(self):
+        self.edits = {}
+
+    def scroll_by(self, delta):
+        self.scroll_to(self.offset + delta)
+        return 'break'
+
+    def scroll_to(self, offset):
+        max_offset = max(0, len(self.rows) - self.visible_count())
+        offset = min(max(0, int(offset)), max_offset)
+        if offset != self.offset:
+            self.offset = offset
+            self.tree.selection_remove(self.tree.selection())
+            self.refresh()
+        return 'break'
+
+    def refresh(self):
+        visible = self.visible_count()
+        max_offset = max(0, len(self.rows) - visible)
+        self.offset = min(self.offset, max_offset)
+        count = min(visible, len(self.rows) - self.offset)
+
+        while len(self._items) < count:
+            self._items.append(self.tree.insert('', 'end'))
+        while len(self._items) > count:
+            self.tree.delete(self._items.pop())
+
+        for slot, item_id in enumerate(self._items):
+            self.tree.item(item_id, values=self._row_values(self.offset + slot))
+
+        self._update_scrollbar(visible)
+
+    def _row_values(self, row_index):
+        return [self.get_value(row_index, col_id) for col_id in self.col_ids]
+
+    def _update_scrollbar(self, visible):
+        total = len(self.rows)
+        if total <= visible:
+            self.v_scroll.set(0.0, 1.0)
+        else:
+            self.v_scroll.set(self.offset / total, (self.offset + visible) / total)
+
+    def _on_yscroll(self, action, amount, unit=None):
+        if action == 'moveto':
+            self.scroll_to(round(float(amount) * len(self.rows)))
+        elif action == 'scroll':
+            step = self.visible_count() if unit == 'pages' else 1
+            self.scroll_by(int(amount) * step)
+
+    def _on_mousewheel(self, event):
+        return self.scroll_by(-3 if event.delta > 0 else 3)
@@ -0,0 +1,314 @@
+"""Watch a drop folder and generate spool files for new or changed invoices.
+
+    python -m modular_app.watcher --watch Invoice/ --workbook Excel/ --mode OE
+
+New PDFs are picked up by polling (woken early by filesystem events when the
+optional `watchdog` package is installed) once their size and mtime have been
+stable for the debounce period. Progress is kept in a JSON state file in the
+output folder so a restart resumes queued work and skips finished invoices.
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+    HAS_WATCHDOG = True
+except ImportError:
+    HAS_WATCHDOG = False
+
+if __package__ is None or __package__ == "":
+    parent_dir = os.path.dirname(os.path.abspath(__file__))
+    sys.path.insert(0, os.path.dirname(parent_dir))
+    from modular_app.services.excel_service import find_workbook_for_date
+    from modular_app.pipeline import SpoolPipeline, SpoolOutputSession
+    from modular_app.cli import get_default_output_dir
+else:
+    from .services.excel_service import find_workbook_for_date
+    from .pipeline import SpoolPipeline, SpoolOutputSession
+    from .cli import get_default_output_dir
+
+STATE_FILENAME = '.watch_state.json'
+
+# Statuses that are final for a given file fingerprint.
+FINISHED_STATUSES = ('written', 'unchanged', 'skipped')
+# Statuses that may depend on the dispatch data: retried once the workbook changes.
+WORKBOOK_STATUSES = ('no_data', 'failed')
+# Statuses of work already handed to the pool (resumed from the state file by poll_once).
+PENDING_STATUSES = ('queued', 'running')
+
+logger = logging.getLogger('spool.watcher')
+
+
+def file_fingerprint(path):
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+class WatchState:
+    """Persistent per-file queue, saved atomically after every change."""
+
+    def __init__(self, state_path):
+        self.state_path = state_path
+        self.files = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                self.files = json.load(f).get('files', {})
+        except (OSError, ValueError):
+            self.files = {}
+
+    def _save(self):
+        tmp_path = self.state_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'files': self.files}, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.state_path)
+
+    def get(self, path):
+        with self._lock:
+            return dict(self.files.get(path, {}))
+
+    def update(self, path, **fields):
+        with self._lock:
+            entry = self.files.setdefault(path, {})
+            entry.update(fields, updated=datetime.now().isoformat(timespec='seconds'))
+            self._save()
+
+    def queued(self):
+        with self._lock:
+            return [path for path, entry in self.files.items() if entry.get('status') in ('queued', 'running')]
+
+
+class SpoolWatcher:
+    def __init__(self, watch_dir, workbook, output_folder, is_spare=False, dispatch_date=None,
+                 interval=5.0, debounce=2.0, workers=2):
+        self.watch_dir = watch_dir
+        self.workbook = workbook
+        self.output_folder = output_folder
+        self.is_spare = is_spare
+        self.fixed_date = dispatch_date
+        self.interval = interval
+        self.debounce = debounce
+        self.workers = max(1, workers)
+
+        os.makedirs(output_folder, exist_ok=True)
+        self.state = WatchState(os.path.join(output_folder, STATE_FILENAME))
+
+        self._pipeline = None
+        self._pipeline_key = None
+        self._candidates = {}
+        self._in_flight = set()
+        self._in_flight_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='spool-watch')
+
+    def dispatch_date(self):
+        return self.fixed_date or datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+
+    def get_pipeline(self):
+        """Return a pipeline loaded with today's workbook, reloading it when the day or file changes."""
+        dispatch_date = self.dispatch_date()
+        if os.path.isdir(self.workbook):
+            excel_path = find_workbook_for_date(self.workbook, dispatch_date)
+        else:
+            excel_path = self.workbook
+        if not excel_path or not os.path.exists(excel_path):
+            return None
+
+        key = (excel_path, os.path.getmtime(excel_path), dispatch_date.date())
+        if key != self._pipeline_key:
+            pipeline = SpoolPipeline(self.is_spare, dispatch_date)
+            pipeline.load(excel_path)
+            self._pipeline = pipeline
+            self._pipeline_key = key
+            logger.info("Loaded workbook %s for %s", excel_path, dispatch_date.strftime('%d-%m-%Y'))
+        return self._pipeline
+
+    def workbook_version(self):
+        return list(map(str, self._pipeline_key)) if self._pipeline_key else None
+
+    def scan(self):
+        """Return PDFs whose size and mtime have been stable for the debounce period."""
+        now = time.monotonic()
+        ready = []
+        seen = set()
+
+        for name in os.listdir(self.watch_dir):
+            if not name.lower().endswith('.pdf'):
+                continue
+            path = os.path.abspath(os.path.join(self.watch_dir, name))
+            try:
+                fingerprint = file_fingerprint(path)
+            except OSError:
+                continue
+            seen.add(path)
+
+            entry = self.state.get(path)
+            if entry.get('fingerprint') == fingerprint:
+                status = entry.get('status')
+                if status in FINISHED_STATUSES or status in PENDING_STATUSES:
+                    continue
+                if status in WORKBOOK_STATUSES and entry.get('workbook') == self.workbook_version():
+                    continue
+
+            candidate = self._candidates.get(path)
+            if not candidate or candidate[0] != fingerprint:
+                self._candidates[path] = (fingerprint, now)
+            elif now - candidate[1] >= self.debounce:
+                ready.append((path, fingerprint))
+
+        for path in list(self._candidates):
+            if path not in seen:
+                del self._candidates[path]
+        return ready
+
+    def submit(self, pipeline, path, fingerprint):
+        # Dropped first: a candidate left behind here would keep the loop in fast polling.
+        self._candidates.pop(path, None)
+        with self._in_flight_lock:
+            if path in self._in_flight:
+                return
+            self._in_flight.add(path)
+        self.state.update(path, fingerprint=fingerprint, status='queued')
+        self._executor.submit(self._process, pipeline, path, fingerprint)
+
+    def _process(self, pipeline, path, fingerprint):
+        try:
+            self.state.update(path, status='running')
+            preview, result = pipeline.prepare(path)
+            if preview is not None:
+                with self._write_lock:
+                    with SpoolOutputSession(self.output_folder) as session:
+                        status, line_count, output_path = pipeline.write(preview, session)
+                result.update(status=status, lines=line_count, output=output_path)
+
+            self.state.update(path, fingerprint=fingerprint, status=result['status'],
+                              invoice_no=result.get('invoice_no', ''), output=result.get('output'),
+                              errors=result['errors'][:5], workbook=self.workbook_version())
+            logger.info("%s: %s %s", os.path.basename(path), result['status'], result.get('output') or '')
+        except Exception as e:
+            logger.exception("%s: processing failed", os.path.basename(path))
+            self.state.update(path, fingerprint=fingerprint, status='failed', errors=[str(e)],
+                              workbook=self.workbook_version())
+        finally:
+            with self._in_flight_lock:
+                self._in_flight.discard(path)
+
+    def poll_once(self):
+        try:
+            pipeline = self.get_pipeline()
+        except Exception:
+            logger.exception("Failed to load workbook")
+            return
+        if pipeline is None:
+            logger.warning("No workbook found for %s", self.dispatch_date().strftime('%d-%m-%Y'))
+            return
+
+        for path in self.state.queued():
+            try:
+                fingerprint = file_fingerprint(path)
+            except OSError:
+                continue
+            self.submit(pipeline, path, fingerprint)
+
+        for path, fingerprint in self.scan():
+            self.submit(pipeline, path, fingerprint)
+
+    def _start_observer(self):
+        if not HAS_WATCHDOG:
+            return None
+
+        watcher = self
+
+        class _WakeHandler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                watcher._wake.set()
+
+        observer = Observer()
+        observer.schedule(_WakeHandler(), self.watch_dir, recursive=False)
+        observer.start()
+        return observer
+
+    def run(self, once=False):
+        observer = self._start_observer()
+        logger.info("Watching %s (%s, %d worker(s), %s)", self.watch_dir, 'Spare' if self.is_spare else 'OE',
+                    self.workers, 'filesystem events' if observer else 'polling')
+        try:
+            while not self._stop.is_set():
+                self.poll_once()
+                if once and not self._candidates:
+                    break
+                # Debounce needs a second look even when no further events arrive.
+                timeout = min(self.interval, self.debounce) if self._candidates else self.interval
+                self._wake.wait(timeout)
+                self._wake.clear()
+        finally:
+            if observer:
+                observer.stop()
+                observer.join()
+            self._executor.shutdown(wait=True)
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog='spool-watch',
+        description="Watch a folder for invoice PDFs and generate spool files automatically.")
+    parser.add_argument('--watch', required=True, help="drop folder containing invoice PDFs")
+    parser.add_argument('--workbook', required=True,
+                        help="dispatch workbook/CSV, or a folder searched for the current day's workbook")
+    parser.add_argument('--mode', choices=['OE', 'Spare'], default='OE')
+    parser.add_argument('--date', help="fixed dispatch date DD-MM-YYYY (default: current day)")
+    parser.add_argument('--output', help="output folder (default: SpoolOutput/Original or Spare)")
+    parser.add_argument('--interval', type=float, default=5.0, help="seconds between folder scans")
+    parser.add_argument('--debounce', type=float, default=2.0,
+                        help="seconds a file must stay unchanged before it is processed")
+    parser.add_argument('--workers', type=int, default=2, help="invoices processed concurrently")
+    parser.add_argument('--once', action='store_true', help="process what is in the folder, then exit")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+
+    dispatch_date = None
+    if args.date:
+        try:
+            dispatch_date = datetime.strptime(args.date, '%d-%m-%Y')
+        except ValueError:
+            logger.error("Invalid date format. Use DD-MM-YYYY")
+            return 2
+
+    if not os.path.isdir(args.watch):
+        logger.error("Watch folder not found: %s", args.watch)
+        return 2
+
+    is_spare = args.mode == 'Spare'
+    watcher = SpoolWatcher(args.watch, args.workbook, args.output or get_default_output_dir(is_spare),
+                           is_spare=is_spare, dispatch_date=dispatch_date, interval=args.interval,
+                           debounce=args.debounce, workers=args.workers)
+    try:
+        watcher.run(once=args.once)
+    except KeyboardInterrupt:
+        watcher.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())